@@ -1,14 +1,45 @@
 from django.contrib import admin
-from .models import Claim, Note
+from .models import Claim, ClaimChange, Insurer, InsurerAlias, Note, Job
 
 @admin.register(Claim)
 class ClaimAdmin(admin.ModelAdmin):
     list_display = ("claim_id", "patient_name", "billed_amount", "paid_amount",
                     "status", "insurer", "flagged")
     list_filter = ("status", "insurer", "flagged")
-    search_fields = ("claim_id", "patient_name", "insurer")
+    list_select_related = ("insurer",)
+    search_fields = ("claim_id", "patient_name", "insurer__name")
+    autocomplete_fields = ("insurer",)
+
+class InsurerAliasInline(admin.TabularInline):
+    model = InsurerAlias
+    extra = 1
+
+@admin.register(Insurer)
+class InsurerAdmin(admin.ModelAdmin):
+    list_display = ("name", "key")
+    search_fields = ("name", "key", "aliases__key")
+    inlines = (InsurerAliasInline,)
 
 @admin.register(Note)
 class NoteAdmin(admin.ModelAdmin):
     list_display = ("claim", "author_name", "created_at")
     search_fields = ("claim__claim_id", "body")
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "attempts", "worker", "created_at", "finished_at")
+    list_filter = ("kind", "status")
+    readonly_fields = ("fingerprint", "worker", "attempts", "started_at", "heartbeat_at", "finished_at")
+
+@admin.register(ClaimChange)
+class ClaimChangeAdmin(admin.ModelAdmin):
+    list_display = ("claim_pk", "changed_at", "op", "source")
+    list_filter = ("op", "source", "month")
+    search_fields = ("claim_pk",)
+
+    # append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
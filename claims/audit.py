@@ -0,0 +1,189 @@
+# claims/audit.py
+"""
+Claim change history.
+
+Every write path that changes a Claim (loaders, flag_set, find_duplicates)
+records it in an AuditLog next to its RollupDelta. A ClaimChange row holds only
+the fields that changed, as {field: [old, new]}, and the log is flushed with
+one bulk INSERT per batch inside the writer's transaction.
+
+state_at() rebuilds a claim as of a timestamp by starting from the current row
+and undoing the changes made after it, newest first. That needs no baseline
+snapshot (claims loaded before the log existed work too) and costs one indexed
+range scan over (claim_pk, changed_at). compact_audit merges each claim's updates
+within a finished month into one (keeping its create row), so storage is
+bounded by claims × months; inside a compacted month, history has month
+granularity.
+
+Writes that bypass these paths (admin edits, ad-hoc shell updates) are not
+recorded and will show up as part of the state before the next logged change.
+"""
+from __future__ import annotations
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import tenants
+from .models import Claim, ClaimChange
+from .rollups import CENT, ROLLUP_FIELDS
+
+AUDIT_FIELDS = ("patient_name", "billed_amount", "paid_amount", "status", "insurer_id", "discharge_date",
+                "need_review", "denial_id", "detail_info")
+
+# What a writer feeding both a RollupDelta and an AuditLog needs to snapshot.
+TRACKED_FIELDS = tuple(dict.fromkeys(("id",) + ROLLUP_FIELDS + AUDIT_FIELDS))
+
+_MODEL_FIELDS = {f: Claim._meta.get_field(f.removesuffix("_id")) for f in AUDIT_FIELDS}
+
+
+def enabled() -> bool:
+    return getattr(settings, "CLAIM_AUDIT", True)
+
+
+def month_key(dt: datetime) -> str:
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _encode(v):
+    if isinstance(v, Decimal):
+        return str(v.quantize(CENT))  # all audited decimals are money; 100.5 == 100.50
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+
+def _decode(field: str, v):
+    if v is None or field == "detail_info":
+        return v
+    if field.endswith("_id"):
+        return int(v)
+    return _MODEL_FIELDS[field].to_python(v)
+
+
+def diff(before: dict | None, after: dict) -> dict:
+    """{field: [old, new]} for audited fields that differ; old is None on create."""
+    before = before or {}
+    out = {}
+    for f in AUDIT_FIELDS:
+        if f not in after:
+            continue
+        old, new = before.get(f), after[f]
+        if old != new:  # Decimal("100.5") == Decimal("100.50"): compare before encoding
+            out[f] = [_encode(old), _encode(new)]
+    return out
+
+
+class AuditLog:
+    """
+    Buffers ClaimChange rows for one writer; flush() inserts them with a single
+    executemany (ORM bulk_create prep cost more than the loaders' own work).
+    """
+
+    _COLUMNS = ("claim_pk", "month", "changed_at", "op", "source", "changes")
+
+    def __init__(self, source: str, batch_size: int = 1000):
+        self.source = source
+        self.batch_size = batch_size
+        self.enabled = enabled()
+        self._rows: list[tuple] = []
+
+    def record(self, claim_pk: int, before: dict | None, after: dict, at: datetime | None = None):
+        """
+        Log one claim write; `before` is None for a newly created claim. Creates
+        store no values: undoing one just means "did not exist yet".
+        """
+        if not self.enabled:
+            return
+        changes = {} if before is None else diff(before, after)
+        if before is not None and not changes:
+            return
+        at = at or timezone.now()
+        self._rows.append((claim_pk, month_key(at), connections[tenants.db()].ops.adapt_datetimefield_value(at),
+                           "c" if before is None else "u", self.source, json.dumps(changes)))
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        connection = connections[tenants.db()]
+        qn = connection.ops.quote_name
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            qn(ClaimChange._meta.db_table),
+            ", ".join(qn(c) for c in self._COLUMNS),
+            ", ".join(["%s"] * len(self._COLUMNS)),
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, self._rows)
+        self._rows = []
+
+
+# ---------- Reconstruction ----------
+def state_at(claim_pk: int, at: datetime) -> dict | None:
+    """Audited fields of a claim as of `at`, or None if it did not exist yet."""
+    current = Claim.objects.filter(pk=claim_pk).values(*AUDIT_FIELDS).first()
+    if current is None:
+        return None
+    later = (ClaimChange.objects
+             .filter(claim_pk=claim_pk, changed_at__gt=at)
+             .order_by("-changed_at", "-pk")
+             .values_list("op", "changes"))
+    for op, changes in later.iterator():
+        if op == "c":
+            return None
+        for f, (old, _new) in changes.items():
+            if f in current:
+                current[f] = _decode(f, old)
+    return current
+
+
+# ---------- Compaction ----------
+def merge_changes(rows) -> dict:
+    """Fold consecutive {field: [old, new]} dicts into one; drops fields that net to no change."""
+    merged: dict[str, list] = {}
+    for changes in rows:
+        for f, (old, new) in changes.items():
+            if f in merged:
+                merged[f][1] = new
+            else:
+                merged[f] = [old, new]
+    return {f: v for f, v in merged.items() if v[0] != v[1]}
+
+
+def compact_month(month: str, batch_size: int = 1000) -> tuple[int, int]:
+    """
+    Replace each claim's updates in one month partition by a single merged row
+    stamped with its last change time. A create row is kept as it is, so the
+    claim still exists from its real creation time on. Returns (rows_before,
+    rows_after).
+    """
+    part = ClaimChange.objects.filter(month=month)
+    rows_before = part.count()
+    multi = list(part.order_by().values("claim_pk").annotate(n=Count("pk"))
+                 .filter(n__gt=1).values_list("claim_pk", flat=True))
+    for i in range(0, len(multi), batch_size):
+        chunk = multi[i:i + batch_size]
+        rows = (part.filter(claim_pk__in=chunk)
+                .order_by("claim_pk", "changed_at", "pk")
+                .values_list("pk", "claim_pk", "changed_at", "op", "changes"))
+        doomed, merged = [], []
+        for claim_pk, group in groupby(rows, key=lambda r: r[1]):
+            updates = [r for r in group if r[3] != "c"]
+            if len(updates) < 2:
+                continue
+            doomed.extend(r[0] for r in updates)
+            changes = merge_changes(r[4] for r in updates)
+            if changes:
+                merged.append(ClaimChange(claim_pk=claim_pk, month=month, changed_at=updates[-1][2],
+                                          op="m", source="compact_audit", changes=changes))
+        with transaction.atomic(using=tenants.db()):
+            ClaimChange.objects.filter(pk__in=doomed).delete()
+            ClaimChange.objects.bulk_create(merged, batch_size=batch_size)
+    return rows_before, part.count()
@@ -0,0 +1,133 @@
+# claims/dedupe.py
+"""
+Blocking-based duplicate claim detection.
+
+Claims are only compared inside blocks that share a discharge date and either
+the same normalized patient name or the same (CPT set, billed amount). Input
+is consumed in discharge_date order, so only one date's claims are held in
+memory at a time and total work is linear in the number of claims (plus the
+small per-block pair counts, capped by max_block). Amount, CPT codes and payer
+only raise the score of claims whose patient names already match, so two
+patients with the same procedure on the same day are never paired.
+"""
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+from decimal import Decimal
+from difflib import SequenceMatcher
+from itertools import combinations, groupby
+from typing import Iterable, Iterator, NamedTuple
+
+from .views import _extract_cpt_list
+
+_NAME_RE = re.compile(r"[^a-z0-9]+")
+_NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "md", "dds", "phd"}
+
+# Feature weights; sum to 1.0.
+W_NAME, W_BILLED, W_CPT, W_INSURER = 0.35, 0.25, 0.25, 0.15
+# Below this name similarity the claims are for different patients, however
+# well amount, codes and payer agree ("john smith" / "jane smith" is 0.8).
+MIN_NAME_SIMILARITY = 0.9
+
+
+class DupRecord(NamedTuple):
+    pk: int
+    claim_id: str
+    name_key: str
+    discharge_date: object
+    billed: Decimal
+    insurer: object  # Insurer id (or a normalized name)
+    cpts: tuple
+
+
+class DupPair(NamedTuple):
+    original: DupRecord
+    duplicate: DupRecord
+    score: float
+
+
+def name_key(name: str | None) -> str:
+    toks = [t for t in _NAME_RE.split((name or "").lower()) if t and t not in _NAME_SUFFIXES]
+    return " ".join(sorted(toks))
+
+
+def cpt_set(info) -> tuple:
+    """The CPT codes the detail panel shows (same key aliases), as a sorted set."""
+    return tuple(sorted({c.upper() for c in _extract_cpt_list(info)}))
+
+
+def make_record(pk, claim_id, patient_name, discharge_date, billed_amount, insurer, detail_info) -> DupRecord:
+    return DupRecord(pk, claim_id, name_key(patient_name), discharge_date,
+                     billed_amount if billed_amount is not None else Decimal("0"),
+                     insurer.strip().lower() if isinstance(insurer, str) else insurer, cpt_set(detail_info))
+
+
+def score_pair(a: DupRecord, b: DupRecord) -> float:
+    """Weighted 0..1 similarity; 0 unless the patient names (nearly) match."""
+    if a.name_key == b.name_key:
+        name = 1.0 if a.name_key else 0.0
+    elif a.name_key and b.name_key:
+        name = SequenceMatcher(None, a.name_key, b.name_key).ratio()
+    else:
+        name = 0.0
+    if name < MIN_NAME_SIMILARITY:
+        return 0.0
+
+    hi = max(abs(a.billed), abs(b.billed))
+    if a.billed == b.billed:
+        billed = 1.0
+    elif hi and abs(a.billed - b.billed) / hi <= Decimal("0.01"):
+        billed = 0.5
+    else:
+        billed = 0.0
+
+    if a.cpts or b.cpts:
+        sa, sb = set(a.cpts), set(b.cpts)
+        cpt = len(sa & sb) / len(sa | sb)
+    else:
+        cpt = 0.5  # unknown on both sides: neutral
+
+    insurer = 1.0 if a.insurer == b.insurer else 0.0
+    return round(W_NAME * name + W_BILLED * billed + W_CPT * cpt + W_INSURER * insurer, 4)
+
+
+def _block_pairs(day: list[DupRecord], max_block: int) -> Iterator[tuple[DupRecord, DupRecord]]:
+    blocks: dict[tuple, list[DupRecord]] = defaultdict(list)
+    for r in day:
+        if r.name_key:
+            blocks[("n", r.name_key)].append(r)
+        if r.cpts:
+            blocks[("c", r.cpts, r.billed)].append(r)
+
+    seen: set[tuple[int, int]] = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > max_block:
+            continue
+        for a, b in combinations(members, 2):
+            key = (a.pk, b.pk) if a.pk < b.pk else (b.pk, a.pk)
+            if key not in seen:
+                seen.add(key)
+                yield a, b
+
+
+def find_duplicates(records: Iterable[DupRecord], threshold: float = 0.7,
+                    max_block: int = 50) -> Iterator[DupPair]:
+    """
+    Yield scored candidate pairs with score >= threshold.
+
+    `records` must be ordered by discharge_date; records without a date are
+    never blocked together. The claim with the higher pk is reported as the
+    duplicate.
+    """
+    for d, day in groupby(records, key=lambda r: r.discharge_date):
+        if d is None:
+            continue
+        day = list(day)
+        if len(day) < 2:
+            continue
+        for a, b in _block_pairs(day, max_block):
+            s = score_pair(a, b)
+            if s >= threshold:
+                orig, dup = (a, b) if a.pk < b.pk else (b, a)
+                yield DupPair(orig, dup, s)
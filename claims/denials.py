@@ -0,0 +1,95 @@
+# claims/denials.py
+"""
+Denial-reason interning.
+
+Raw denial text is normalized to a token key. Exact keys resolve through
+DenialReasonAlias; unseen keys are matched against existing reasons with a
+token inverted index (Jaccard similarity) and either aliased to the closest
+reason or interned as a new one. Memory is bounded by the number of distinct
+reasons, not by the number of claims.
+"""
+from __future__ import annotations
+
+import re
+from collections import defaultdict
+
+from .models import DenialReason, DenialReasonAlias
+
+EMPTY_REASONS = {"", "n/a", "na", "none", "null", "-", "—"}
+
+STOPWORDS = {"a", "an", "the", "of", "to", "for", "on", "in", "at", "by", "or", "and", "is", "was", "be"}
+
+_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _stem(tok: str) -> str:
+    if len(tok) > 4 and tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+
+def tokenize(text: str | None) -> frozenset[str]:
+    raw = (text or "").strip().lower()
+    if raw in EMPTY_REASONS:
+        return frozenset()
+    return frozenset(_stem(t) for t in _SPLIT_RE.split(raw) if t and t not in STOPWORDS)
+
+
+def reason_key(tokens) -> str:
+    return " ".join(sorted(tokens))[:255]
+
+
+class DenialReasonIndex:
+    """
+    Resolves denial text to a DenialReason id, creating reasons/aliases on demand.
+
+    Build once per command run; resolve() is O(tokens × postings) for unseen
+    texts and a dict lookup for everything seen before.
+    """
+
+    def __init__(self, threshold: float = 0.6):
+        self.threshold = threshold
+        self._alias: dict[str, int] = dict(DenialReasonAlias.objects.values_list("key", "reason_id"))
+        self._tokens: dict[int, frozenset[str]] = {}
+        self._postings: dict[str, set[int]] = defaultdict(set)
+        for rid, key in DenialReason.objects.values_list("id", "key"):
+            self._index(rid, frozenset(key.split()))
+            self._alias.setdefault(key, rid)
+
+    def _index(self, rid: int, toks: frozenset[str]):
+        self._tokens[rid] = toks
+        for t in toks:
+            self._postings[t].add(rid)
+
+    def _closest(self, toks: frozenset[str]) -> int | None:
+        shared: dict[int, int] = defaultdict(int)
+        for t in toks:
+            for rid in self._postings.get(t, ()):
+                shared[rid] += 1
+        best, best_score = None, 0.0
+        for rid, n in shared.items():
+            score = n / len(toks | self._tokens[rid])
+            if score > best_score:
+                best, best_score = rid, score
+        return best if best_score >= self.threshold else None
+
+    def resolve(self, text: str | None, create: bool = True) -> int | None:
+        toks = tokenize(text)
+        if not toks:
+            return None
+        key = reason_key(toks)
+        rid = self._alias.get(key)
+        if rid is not None:
+            return rid
+
+        rid = self._closest(toks)
+        if not create:
+            return rid
+        if rid is None:
+            rid = DenialReason.objects.create(text=text.strip()[:255], key=key).pk
+            self._index(rid, toks)
+        DenialReasonAlias.objects.get_or_create(key=key, defaults={"reason_id": rid})
+        self._alias[key] = rid
+        return rid
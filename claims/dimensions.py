@@ -0,0 +1,96 @@
+# claims/dimensions.py
+"""
+Normalization for the low-cardinality claim dimensions.
+
+Status is an enum (Claim.Status). Raw feed spellings resolve through a
+precomputed table; the keyword rules only run for spellings not seen before,
+and anything that matches no status is rejected (None) rather than stored.
+
+Insurer is a dimension table. Raw names are normalized to a key (case,
+punctuation and legal suffixes dropped) and resolved through InsurerAlias /
+Insurer.key by an in-memory InsurerIndex, so a load touches the database once
+per distinct name, not once per row, and claims carry an integer id.
+"""
+from __future__ import annotations
+
+import re
+
+from .models import Claim, Insurer, InsurerAlias
+
+Status = Claim.Status
+
+# Raw spelling (stripped, lower-cased) -> status code. Grows with the keyword
+# rules' results, capped so junk input cannot grow it without bound.
+STATUS_ALIASES: dict[str, str | None] = {}
+for _s in Status:
+    for _raw in (_s.value, _s.label, _s.value.replace("_", " "), _s.value.replace("_", "-")):
+        STATUS_ALIASES[_raw.lower()] = _s.value
+STATUS_ALIASES.update({"deny": Status.DENIED.value, "denial": Status.DENIED.value,
+                       "rejected": Status.DENIED.value, "pay": Status.PAID.value,
+                       "review": Status.UNDER_REVIEW.value, "pending": Status.UNDER_REVIEW.value,
+                       "in review": Status.UNDER_REVIEW.value, "pending review": Status.UNDER_REVIEW.value})
+_STATUS_ALIAS_CAP = 1024
+
+
+def _status_by_keyword(v: str) -> str | None:
+    v = v.replace("-", " ").replace("_", " ")
+    if "deny" in v or "denied" in v or "denial" in v:
+        return Status.DENIED.value
+    if "paid" in v or "pay" in v:
+        return Status.PAID.value
+    if "review" in v:
+        return Status.UNDER_REVIEW.value
+    return None
+
+
+def normalize_status(value) -> str | None:
+    """Claim.Status code for a raw status, or None when it is empty or unrecognized."""
+    if not value:
+        return None
+    raw = str(value).strip().lower()
+    try:
+        return STATUS_ALIASES[raw]
+    except KeyError:
+        code = _status_by_keyword(raw)
+        if len(STATUS_ALIASES) < _STATUS_ALIAS_CAP:
+            STATUS_ALIASES[raw] = code
+        return code
+
+
+_KEY_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+LEGAL_SUFFIXES = {"inc", "llc", "llp", "ltd", "corp", "corporation", "co", "company", "plc"}
+
+
+def insurer_key(name: str | None) -> str:
+    """'Self Funded, Inc.' -> 'self funded'; '' for a blank name."""
+    toks = [t for t in _KEY_SPLIT_RE.split((name or "").lower().replace("&", " and ")) if t]
+    while len(toks) > 1 and toks[-1] in LEGAL_SUFFIXES:
+        toks.pop()
+    return " ".join(toks)[:128]
+
+
+class InsurerIndex:
+    """
+    Resolves raw insurer names to Insurer ids, creating insurers on demand.
+
+    Build once per command run (it loads every key, which is one row per payer
+    or alias); resolve() is a dict lookup for every name seen before.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, int] = dict(InsurerAlias.objects.values_list("key", "insurer_id"))
+        for iid, key in Insurer.objects.values_list("id", "key"):
+            self._ids.setdefault(key, iid)
+        self._raw: dict[str, int | None] = {}
+
+    def resolve(self, name: str | None, create: bool = True) -> int | None:
+        raw = name or ""
+        if raw in self._raw:
+            return self._raw[raw]
+        key = insurer_key(raw)
+        iid = self._ids.get(key) if key else None
+        if iid is None and key and create:
+            iid = Insurer.objects.get_or_create(key=key, defaults={"name": raw.strip()[:128]})[0].pk
+            self._ids[key] = iid
+        self._raw[raw] = iid
+        return iid
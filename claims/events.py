@@ -0,0 +1,186 @@
+# claims/events.py
+"""
+Live claim change events for the SSE endpoint.
+
+publish() is called from sync code (views, commands) after a claim changes.
+Each server process keeps one EventBus; every SSE client is a Subscriber with
+a small bounded buffer, so an idle connection costs one coroutine and a deque.
+Events carry the tenant they happened in (claims/tenants.py) and only reach
+that tenant's subscribers.
+
+Backends (settings.CLAIM_EVENTS_BACKEND):
+- "memory": publish() hands events straight to this process's subscribers.
+  Only correct with a single server process.
+- "db" (default): publish() inserts a ClaimEvent row; one poller task per
+  process reads new rows and fans them out locally. Works across ASGI workers
+  and picks up changes made by management commands / runworker.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import tenants
+from .models import ClaimEvent
+
+BUFFER_SIZE = 64
+POLL_INTERVAL = 0.5
+RETENTION = timedelta(minutes=5)  # must outlast views.SSE_MAX_AGE so reconnects can replay
+REPLAY_LIMIT = 500
+
+
+def backend() -> str:
+    return getattr(settings, "CLAIM_EVENTS_BACKEND", "db")
+
+
+class Subscriber:
+    """One SSE client. Overflowing the buffer drops events and requests a resync."""
+
+    def __init__(self, loop, tenant: str = "", maxlen: int = BUFFER_SIZE):
+        self.loop = loop
+        self.tenant = tenant
+        self.buffer: deque = deque(maxlen=maxlen)
+        self.overflowed = False
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict):  # always runs on self.loop
+        if len(self.buffer) == self.buffer.maxlen:
+            self.overflowed = True
+        self.buffer.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float) -> list[dict] | None:
+        """Wait for events; None on timeout, [] when the client must resync."""
+        if not self.buffer:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self.overflowed:
+            self.overflowed = False
+            self.buffer.clear()
+            return []
+        events = list(self.buffer)
+        self.buffer.clear()
+        return events
+
+
+class EventBus:
+    def __init__(self):
+        self._subs: set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._poller: asyncio.Task | None = None
+        self._last_id = 0
+
+    def __len__(self):
+        return len(self._subs)
+
+    def subscribe(self, tenant: str = "") -> Subscriber:
+        """Register a client of `tenant`; must be called from the event loop that will read it."""
+        loop = asyncio.get_running_loop()
+        sub = Subscriber(loop, tenant)
+        with self._lock:
+            self._subs.add(sub)
+        if backend() == "db" and (self._poller is None or self._poller.done()):
+            # Created before any await so concurrent subscribers share one poller.
+            self._poller = loop.create_task(self._poll())
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def dispatch(self, event: dict):
+        """Thread-safe: deliver to the event's tenant's local subscribers, each on its own loop."""
+        tenant = event.get("tenant", "")
+        with self._lock:
+            subs = [sub for sub in self._subs if sub.tenant == tenant]
+        for sub in subs:
+            sub.loop.call_soon_threadsafe(sub.push, event)
+
+    async def _poll(self):
+        fetch = sync_to_async(_events_after, thread_sensitive=False)
+        self._last_id = await sync_to_async(_latest_event_id, thread_sensitive=False)()
+        last_prune = 0.0
+        while self._subs:
+            rows = await fetch(self._last_id)
+            for pk, payload in rows:
+                self._last_id = pk
+                self.dispatch(dict(payload, id=pk))
+            if time.monotonic() - last_prune > 60:
+                last_prune = time.monotonic()
+                await sync_to_async(_prune, thread_sensitive=False)()
+            await asyncio.sleep(POLL_INTERVAL)
+
+
+def _latest_event_id() -> int:
+    return ClaimEvent.objects.order_by("-pk").values_list("pk", flat=True).first() or 0
+
+
+def _events_after(last_id: int, limit: int = REPLAY_LIMIT):
+    return list(ClaimEvent.objects.filter(pk__gt=last_id).order_by("pk").values_list("pk", "payload")[:limit])
+
+
+def replay_after(last_id: str, tenant: str = "") -> list[dict] | None:
+    """
+    `tenant`'s events after a reconnecting client's Last-Event-ID, or None when
+    they cannot all be replayed (memory backend, pruned, or too many): resync.
+    """
+    if backend() != "db" or not last_id.isdigit():
+        return None
+    last_id = int(last_id)
+    oldest = ClaimEvent.objects.order_by("pk").values_list("pk", flat=True).first()
+    if oldest is None or oldest > last_id + 1:
+        return None
+    rows = _events_after(last_id)
+    if len(rows) == REPLAY_LIMIT:
+        return None
+    return [dict(payload, id=pk) for pk, payload in rows if payload.get("tenant", "") == tenant]
+
+
+def _prune():
+    ClaimEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()
+
+
+bus = EventBus()
+
+
+def publish(claim_pk: int, fields: dict | None = None, fragments: dict | None = None):
+    """
+    Announce a claim change. `fields` are the changed values; `fragments` maps
+    DOM ids (e.g. "flag-btn-12") to pre-rendered HTML the client swaps in.
+
+    Called inside the tenant's transaction, the event goes out only once that
+    commits (and never if it rolls back); outside one, it goes out at once.
+    """
+    payload = {"pk": claim_pk, "tenant": tenants.current(), "fields": fields or {}, "fragments": fragments or {}}
+    transaction.on_commit(lambda: _send(payload), using=tenants.db())
+
+
+def _send(payload: dict):
+    if backend() == "db":
+        ClaimEvent.objects.create(claim_pk=payload["pk"], payload=payload)
+    else:
+        bus.dispatch(payload)
+
+
+def publish_flag(claim):
+    publish(claim.pk,
+            fields={"need_review": claim.need_review, "status": claim.status},
+            fragments={f"flag-btn-{claim.pk}": render_to_string("claims/_flag_button.html", {"claim": claim})})
+
+
+def publish_notes(claim):
+    publish(claim.pk,
+            fields={"notes": claim.notes.count()},
+            fragments={f"notes-list-{claim.pk}": render_to_string("claims/_notes_list.html", {"claim": claim})})
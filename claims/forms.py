@@ -14,3 +14,26 @@ class NoteForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields["body"].required = True
         self.fields["author_name"].required = True
+
+
+class ImportJobForm(forms.Form):
+    KIND_CHOICES = [
+        ("load_claims", "Claims file (load_claims)"),
+        ("load_details", "Detail file (load_details)"),
+    ]
+    RESET_NOTES_CHOICES = [
+        ("keep", "Keep existing notes"),
+        ("file", "Clear notes of claims in this file"),
+        ("all", "Clear all notes"),
+    ]
+
+    kind = forms.ChoiceField(choices=KIND_CHOICES)
+    file = forms.FileField()
+    delimiter = forms.CharField(max_length=2, initial="|", strip=False)
+    reset_notes = forms.ChoiceField(choices=RESET_NOTES_CHOICES, initial="keep", required=False)
+
+    def job_options(self) -> dict:
+        opts = {"delimiter": self.cleaned_data["delimiter"] or "|"}
+        if self.cleaned_data["kind"] == "load_claims":
+            opts["reset_notes"] = self.cleaned_data.get("reset_notes") or "keep"
+        return opts
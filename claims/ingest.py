@@ -0,0 +1,277 @@
+# claims/ingest.py
+"""
+Shared plumbing for multi-file loads (load_claims, load_details, ingest).
+
+- expand_paths(): files, directories, glob patterns and zip archives -> an
+  ordered list of Sources (a file, or one member of a zip).
+- open_text(): streams a Source through gzip/bz2/xz/zstd decompression,
+  chosen by magic bytes, so nothing is extracted to disk and format sniffing
+  sees the decompressed text. zstd needs the optional `zstandard` package.
+- ClaimIdMap: bounded LRU claim_id -> pk cache shared by every file in a run,
+  so detail files loaded after their claims files need no id lookups.
+- pipelined(): reads/parses the next file on a background thread while the
+  caller writes the current one; at most two files are held in memory.
+- run_files(): the per-file loop shared by the commands.
+- FileReport: per-file counters printed as one line each.
+"""
+from __future__ import annotations
+
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+from django.core.management.base import CommandError
+
+from .models import Claim
+
+DEFAULT_ID_CACHE = 200_000
+LOOKUP_CHUNK = 500
+
+
+try:
+    import zstandard
+except ImportError:  # optional: .zst inputs fail with a clear error instead
+    zstandard = None
+
+ZIP_MAGIC = b"PK\x03\x04"
+COMPRESSION_SUFFIXES = (".gz", ".bz2", ".xz", ".zst")
+
+
+def _open_zstd(fh):
+    if zstandard is None:
+        raise CommandError("zstd input needs the 'zstandard' package (pip install zstandard).")
+    return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+        fh, read_across_frames=True, closefd=False))
+
+
+# magic bytes -> opener(binary file) -> decompressed binary stream
+DECOMPRESSORS = (
+    (b"\x1f\x8b", lambda fh: gzip.GzipFile(fileobj=fh)),
+    (b"BZh", bz2.BZ2File),
+    (b"\xfd7zXZ\x00", lzma.LZMAFile),
+    (b"\x28\xb5\x2f\xfd", _open_zstd),
+)
+
+
+class Source(NamedTuple):
+    """An input file, or one member of a zip archive."""
+    path: Path
+    member: str = ""
+
+    def __str__(self):
+        return f"{self.path}!{self.member}" if self.member else str(self.path)
+
+    @property
+    def suffix(self) -> str:
+        """Data suffix with compression suffixes stripped: 'a.csv.gz' -> '.csv'."""
+        return data_suffix(self.member or self.path.name)
+
+
+def data_suffix(name: str) -> str:
+    p = Path(name.lower())
+    while p.suffix in COMPRESSION_SUFFIXES:
+        p = p.with_suffix("")
+    return p.suffix
+
+
+def _is_zip(path: Path) -> bool:
+    with path.open("rb") as f:
+        return f.read(4) == ZIP_MAGIC
+
+
+def _sources(path: Path, suffixes: tuple[str, ...], explicit: bool) -> list[Source]:
+    """A file as Sources: zip archives expand to their matching members."""
+    if _is_zip(path):
+        with zipfile.ZipFile(path) as zf:
+            members = sorted(i.filename for i in zf.infolist()
+                             if not i.is_dir() and not i.filename.startswith("__MACOSX/"))
+        return [Source(path, m) for m in members if not suffixes or data_suffix(m) in suffixes]
+    if explicit or not suffixes or data_suffix(path.name) in suffixes:
+        return [Source(path)]
+    return []
+
+
+def expand_paths(patterns, suffixes: tuple[str, ...] = ()) -> list[Source]:
+    """
+    Resolve each argument as a file, a directory (its files and zips whose
+    data suffix is in `suffixes`, sorted, non-recursive) or a glob (`**`
+    allowed). Zip archives expand to their members. Order is kept and
+    duplicates dropped; a pattern that matches nothing is an error.
+    """
+    out: dict[Source, None] = {}
+    for pattern in patterns:
+        p = Path(pattern).expanduser()
+        if p.is_dir():
+            files, explicit = sorted(f for f in p.iterdir() if f.is_file()), False
+        elif p.is_file():
+            files, explicit = [p], True
+        else:
+            files, explicit = sorted(Path(m) for m in glob.glob(str(p), recursive=True) if Path(m).is_file()), True
+        matches = [src for f in files for src in _sources(f.resolve(), suffixes, explicit)]
+        if not matches:
+            raise CommandError(f"No input files match {pattern!r}.")
+        for m in matches:
+            out.setdefault(m, None)
+    return list(out)
+
+
+def _decompressed(fh):
+    """Wrap a binary stream in the decompressor its magic bytes call for (if any)."""
+    if not hasattr(fh, "peek"):
+        fh = io.BufferedReader(fh)
+    head = fh.peek(6)[:6]
+    for magic, opener in DECOMPRESSORS:
+        if head.startswith(magic):
+            return opener(fh)
+    return fh
+
+
+@contextmanager
+def open_binary(src: Source):
+    """Decompressed binary stream of a Source; nothing is extracted to disk."""
+    with ExitStack() as stack:
+        fh = stack.enter_context(src.path.open("rb"))
+        if src.member:
+            fh = stack.enter_context(stack.enter_context(zipfile.ZipFile(fh)).open(src.member))
+        yield stack.enter_context(_decompressed(fh))
+
+
+@contextmanager
+def open_text(src: Source, encoding: str = "utf-8"):
+    """Text stream (newline="" as csv wants) over open_binary()."""
+    with open_binary(src) as fh:
+        text = io.TextIOWrapper(fh, encoding=encoding, newline="")
+        try:
+            yield text
+        finally:
+            text.detach()
+
+
+class ClaimIdMap:
+    """claim_id -> pk, least-recently-used entries evicted beyond `maxsize`."""
+
+    def __init__(self, maxsize: int = DEFAULT_ID_CACHE):
+        self.maxsize = maxsize
+        self._map: OrderedDict[str, int] = OrderedDict()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self._map)
+
+    def put(self, claim_id: str, pk: int):
+        self._map[claim_id] = pk
+        self._map.move_to_end(claim_id)
+        if len(self._map) > self.maxsize:
+            self._map.popitem(last=False)
+
+    def forget(self, claim_ids):
+        """Drop entries written by a transaction that rolled back."""
+        for cid in claim_ids:
+            self._map.pop(cid, None)
+
+    def resolve(self, claim_ids) -> dict[str, int]:
+        """pks for the given ids that exist; unknown ids cost one query per LOOKUP_CHUNK."""
+        found: dict[str, int] = {}
+        unknown = []
+        for cid in dict.fromkeys(claim_ids):
+            pk = self._map.get(cid)
+            if pk is None:
+                unknown.append(cid)
+            else:
+                self._map.move_to_end(cid)
+                found[cid] = pk
+        self.hits += len(found)
+        self.misses += len(unknown)
+        for i in range(0, len(unknown), LOOKUP_CHUNK):
+            for cid, pk in Claim.objects.filter(claim_id__in=unknown[i:i + LOOKUP_CHUNK]).values_list("claim_id", "pk"):
+                self.put(cid, pk)
+                found[cid] = pk
+        return found
+
+
+def pipelined(items, read):
+    """
+    Yield (item, data, error) in order. read(item) for the next item runs on
+    a worker thread while the caller handles the current one; it must not
+    touch the database.
+    """
+    items = list(items)
+    if not items:
+        return
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-read") as pool:
+        future = pool.submit(read, items[0])
+        for i, item in enumerate(items):
+            try:
+                data, error = future.result(), None
+            except Exception as e:  # reported per file by the caller
+                data, error = None, e
+            future = pool.submit(read, items[i + 1]) if i + 1 < len(items) else None
+            yield item, data, error
+
+
+def run_files(command, steps, progress=None) -> list[FileReport]:
+    """
+    Run (path, kind, read, load) steps in order through pipelined(): read(path)
+    parses on the reader thread, load(report, parsed, progress) writes one file
+    in its own transaction. Each file gets a report line on command.stdout; a
+    failed file is reported and the run goes on.
+    """
+    reports: list[FileReport] = []
+    total = len(steps)
+    for n, ((path, kind, _read, load), parsed, error) in enumerate(
+            pipelined(steps, lambda step: step[2](step[0])), 1):
+        report = FileReport(path, kind).start()
+        file_progress = None
+        if progress:
+            base = sum(r.rows for r in reports)
+            file_progress = lambda done, of=None, base=base: progress(base + done, of if total == 1 else None)  # noqa: E731
+        try:
+            if error:
+                raise error
+            load(report, parsed, file_progress)
+        except Exception as e:
+            report.error = str(e) or type(e).__name__
+        reports.append(report.stop())
+        style = command.style.WARNING if report.error else command.style.SUCCESS
+        command.stdout.write(style(f"[{n}/{total}] {report.line()}"))
+    return reports
+
+
+@dataclass
+class FileReport:
+    path: Source
+    kind: str = "claims"
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    missing: int = 0
+    seconds: float = 0.0
+    error: str = ""
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def stop(self):
+        self.seconds = time.perf_counter() - self._t0
+        return self
+
+    def line(self) -> str:
+        if self.error:
+            return f"{self.path}: FAILED ({self.error})"
+        counts = f"rows={self.rows} created={self.created} updated={self.updated} skipped={self.skipped}"
+        if self.kind == "details":
+            counts = f"rows={self.rows} updated={self.updated} missing={self.missing}"
+        rate = self.rows / self.seconds if self.seconds else 0
+        return f"{self.path}: {counts} in {self.seconds:.2f}s ({rate:.0f} rows/s)"
@@ -0,0 +1,266 @@
+# claims/jobs.py
+"""
+Lightweight DB-backed job queue (no Redis/Celery).
+
+- submit_job()/submit_upload() enqueue a Job; active jobs are unique per fingerprint
+  (tenant, kind, options and file contents), so a finished import can be rerun.
+- `manage.py runworker` claims queued jobs with a compare-and-set UPDATE and runs
+  them in a process pool via call_command().
+- Jobs live in the default database and carry the tenant they were submitted
+  for; run_job() passes it to the command as --tenant, so jobs for different
+  tenants write to different database files and run in parallel.
+- Progress goes to a small JSON sidecar file per job (JOBS_ROOT/<pk>.json) rather
+  than the DB, so it stays visible while an import holds SQLite's write lock.
+  Its mtime doubles as a heartbeat for crash recovery.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import socket
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+# kind -> whether the command takes an input path and accepts the `progress` stealth option
+JOB_KINDS = {
+    "load_claims": {"needs_file": True, "progress": True},
+    "load_details": {"needs_file": True, "progress": True},
+    "rebuild_rollups": {"needs_file": False, "progress": False},
+    "find_duplicates": {"needs_file": False, "progress": False},
+}
+
+MAX_ATTEMPTS = 3
+
+
+def jobs_root() -> Path:
+    root = Path(getattr(settings, "JOBS_ROOT", Path(settings.BASE_DIR) / "var" / "jobs"))
+    root.mkdir(parents=True, exist_ok=True)
+    return root
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ---------- Submission ----------
+def submit_job(kind: str, input_path: str = "", options: dict | None = None,
+               fingerprint: str = "", tenant: str = "") -> tuple[Job, bool]:
+    """Enqueue a job for `tenant`; returns (job, created). A queued or running job with the same fingerprint is reused."""
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if fingerprint:
+        existing = (Job.objects.filter(fingerprint=fingerprint, status__in=Job.ACTIVE_STATUSES)
+                    .order_by("-created_at").first())
+        if existing:
+            return existing, False
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(kind=kind, tenant=tenant, input_path=str(input_path),
+                                     options=options or {}, fingerprint=fingerprint)
+    except IntegrityError:
+        # Lost a race with an identical submission.
+        return Job.objects.get(fingerprint=fingerprint, status__in=Job.ACTIVE_STATUSES), False
+    return job, True
+
+
+def submit_upload(kind: str, upload, options: dict | None = None, tenant: str = "") -> tuple[Job, bool]:
+    """Stream an UploadedFile to JOBS_ROOT while hashing it, then enqueue it."""
+    h = hashlib.sha256()
+    suffix = "".join(Path(upload.name or "").suffixes)[-16:]
+    tmp = jobs_root() / f"upload-{os.getpid()}-{time.monotonic_ns()}.part"
+    with tmp.open("wb") as out:
+        for chunk in upload.chunks():
+            h.update(chunk)
+            out.write(chunk)
+    content = h.hexdigest()
+    dest = jobs_root() / f"{content}{suffix}"
+    os.replace(tmp, dest)
+    return submit_job(kind, str(dest), options, fingerprint=job_fingerprint(kind, content, options, tenant),
+                      tenant=tenant)
+
+
+def job_fingerprint(kind: str, content: str, options: dict | None = None, tenant: str = "") -> str:
+    """Same file, options and tenant -> same fingerprint; a different delimiter or tenant is another job."""
+    key = json.dumps([tenant, kind, options or {}, content], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+# ---------- Progress sidecar ----------
+def progress_path(job_id: int) -> Path:
+    return jobs_root() / f"{job_id}.json"
+
+
+class ProgressFile:
+    """Callable passed to commands as `progress(done, total=None)`; throttled writes."""
+
+    def __init__(self, job_id: int, every: float = 0.5):
+        self.path = progress_path(job_id)
+        self.every = every
+        self._last = 0.0
+
+    def __call__(self, done: int, total: int | None = None, force: bool = False):
+        now = time.monotonic()
+        if not force and done != total and now - self._last < self.every:
+            return
+        self._last = now
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"done": done, "total": total}))
+        os.replace(tmp, self.path)
+
+    def touch(self):
+        if self.path.exists():
+            os.utime(self.path)
+        else:
+            self(0, None, force=True)
+
+
+def read_progress(job: Job) -> dict:
+    try:
+        data = json.loads(progress_path(job.pk).read_text())
+    except (OSError, ValueError):
+        return {"done": 0, "total": None, "percent": None}
+    total = data.get("total")
+    data["percent"] = int(data["done"] * 100 / total) if total else None
+    return data
+
+
+# ---------- Worker side ----------
+def claim_next(worker: str) -> Job | None:
+    """Atomically move the oldest queued job to running for `worker`."""
+    now = timezone.now()
+    for pk in Job.objects.filter(status="queued").order_by("created_at", "pk").values_list("pk", flat=True)[:20]:
+        if Job.objects.filter(pk=pk, status="queued").update(
+                status="running", worker=worker, started_at=now, heartbeat_at=now,
+                attempts=F("attempts") + 1):
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def heartbeat(job_ids) -> None:
+    for pk in job_ids:
+        ProgressFile(pk).touch()
+    try:
+        Job.objects.filter(pk__in=list(job_ids), status="running").update(heartbeat_at=timezone.now())
+    except OperationalError:
+        pass  # DB write-locked by a running import; the sidecar mtime still counts
+
+
+def _pid_alive(worker: str) -> bool:
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # can't tell from here; rely on the lease
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def recover_stale(lease_seconds: int = 300) -> int:
+    """
+    Requeue (or fail, after MAX_ATTEMPTS) running jobs whose worker died:
+    its pid is gone on this host, or neither the DB heartbeat nor the
+    progress sidecar has been touched within the lease.
+    """
+    cutoff = timezone.now() - timedelta(seconds=lease_seconds)
+    recovered = 0
+    for job in Job.objects.filter(status="running"):
+        try:
+            sidecar_fresh = progress_path(job.pk).stat().st_mtime >= cutoff.timestamp()
+        except OSError:
+            sidecar_fresh = False
+        lease_ok = sidecar_fresh or (job.heartbeat_at and job.heartbeat_at >= cutoff)
+        if lease_ok and _pid_alive(job.worker):
+            continue
+        recovered += release(job.pk, "Worker lost; ", expected_worker=job.worker)
+    return recovered
+
+
+def release(job_id: int, reason: str = "", expected_worker: str | None = None) -> int:
+    """Put a running job back in the queue, or fail it once attempts are used up."""
+    qs = Job.objects.filter(pk=job_id, status="running")
+    if expected_worker is not None:
+        qs = qs.filter(worker=expected_worker)
+    job = qs.first()
+    if job is None:
+        return 0
+    if job.attempts >= MAX_ATTEMPTS:
+        return qs.update(status="failed", finished_at=timezone.now(),
+                         message=f"{reason}gave up after {job.attempts} attempts.")
+    return qs.update(status="queued", worker="", message=f"{reason}requeued (attempt {job.attempts}).")
+
+
+def finish(job_id: int, outcome: str, message: str) -> None:
+    """Record a run_job() outcome: "done", "failed", or "retry" (lost a DB lock race)."""
+    qs = Job.objects.filter(pk=job_id, status="running")
+    if outcome == "retry":
+        # Not the job's fault; don't count the attempt.
+        qs.update(status="queued", worker="", attempts=F("attempts") - 1,
+                  message="Database busy; requeued.")
+        return
+    qs.update(status=outcome, message=message[-4000:], finished_at=timezone.now())
+
+
+def preload_job_modules():
+    """
+    Import every job command, and the modules they import lazily, once in the
+    runworker parent so forked pool processes start with them already loaded.
+    """
+    from django.core.management import load_command_class
+
+    from . import audit, dedupe, denials, events, queues, rollups  # noqa: F401
+
+    for kind in JOB_KINDS:
+        load_command_class("claims", kind)
+
+
+def init_worker_process():
+    """ProcessPoolExecutor initializer: make sure Django is set up with fresh connections."""
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _is_lock_error(e: Exception) -> bool:
+    return isinstance(e, OperationalError) and "locked" in str(e)
+
+
+def run_job(job_id: int) -> tuple[str, str]:
+    """Executed in a pool process. Never raises; returns (outcome, output) for finish()."""
+    from django.core.management import call_command
+    from django.db import connections
+
+    out = io.StringIO()
+    try:
+        job = Job.objects.get(pk=job_id)
+        spec = JOB_KINDS[job.kind]
+        args = [job.input_path] if spec["needs_file"] else []
+        opts = dict(job.options or {}, tenant=job.tenant)
+        progress = ProgressFile(job_id)
+        if spec["progress"]:
+            opts["progress"] = progress
+        call_command(job.kind, *args, stdout=out, stderr=out, **opts)
+        progress.touch()
+        return "done", out.getvalue()
+    except Exception as e:  # surfaced on the job row
+        # SQLite returns "database is locked" without waiting when two write
+        # transactions deadlock; the loaders are atomic, so just rerun later.
+        return ("retry" if _is_lock_error(e) else "failed"), f"{out.getvalue()}\n{type(e).__name__}: {e}"
+    finally:
+        connections.close_all()
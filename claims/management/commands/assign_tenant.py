@@ -0,0 +1,66 @@
+# claims/management/commands/assign_tenant.py
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from claims import tenants
+from claims.models import Claim, Note
+
+TENANT_KEYED = (Claim, Note)
+
+
+def assign(tenant: str, db: str) -> dict[str, int]:
+    """Tag the untagged (tenant "") claims and notes in database `db` with `tenant`; rows per model."""
+    counts = {}
+    with transaction.atomic(using=db):
+        for model in TENANT_KEYED:
+            # _base_manager: the default TenantManager would hide exactly these rows.
+            counts[model._meta.verbose_name_plural] = (
+                model._base_manager.using(db).filter(tenant="").update(tenant=tenant))
+    return counts
+
+
+class Command(BaseCommand):
+    help = ("Hand claims and notes that predate tenants (loaded with no tenant bound) to a tenant: "
+            "tags them in the tenant's database so its TenantManager shows them. With --copy-default, "
+            "first copies the default database into the tenant's empty one, which turns a "
+            "single-client install into that client's tenant.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("tenant", help="Slug from settings.CLAIM_TENANTS.")
+        parser.add_argument("--copy-default", action="store_true",
+                            help="Copy db.sqlite3 into the tenant's database file first (it must hold no claims).")
+
+    def handle(self, *args, **opts):
+        tenant = opts["tenant"]
+        try:
+            db = tenants.db_alias(tenant) if tenant else None
+        except tenants.UnknownTenant:
+            db = None
+        if db is None:
+            raise CommandError(f"Unknown tenant {tenant!r}; configured: {', '.join(tenants.configured()) or 'none'}.")
+
+        if opts["copy_default"]:
+            self._copy_default(db)
+        counts = assign(tenant, db)
+        self.stdout.write(self.style.SUCCESS(
+            f"Assigned to {tenant}: " + ", ".join(f"{n} {name}" for name, n in counts.items())))
+
+    def _copy_default(self, db: str):
+        target = connections[db]
+        if target.vendor != "sqlite" or connections[tenants.DEFAULT_DB].vendor != "sqlite":
+            raise CommandError("--copy-default only copies SQLite files; copy the database by other means.")
+        if (Claim._meta.db_table in target.introspection.table_names()
+                and Claim._base_manager.using(db).exists()):
+            raise CommandError(f"{target.settings_dict['NAME']} already holds claims; not overwriting it.")
+        target.close()
+        source = connections[tenants.DEFAULT_DB]
+        source.ensure_connection()
+        dest = sqlite3.connect(str(settings.DATABASES[db]["NAME"]))
+        try:
+            source.connection.backup(dest)
+        finally:
+            dest.close()
+        self.stdout.write(f"Copied {source.settings_dict['NAME']} -> {target.settings_dict['NAME']}")
@@ -0,0 +1,94 @@
+# claims/management/commands/bench_audit.py
+import csv
+import io
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from claims import tenants
+
+ID_PREFIX = "bench-"  # keeps the benchmark's claims apart from real ones
+
+
+def _write_passes(src: Path, tmp: Path, delimiter: str) -> tuple[Path, Path, int]:
+    """
+    The fixed input as two files: a create pass, then an update pass that
+    changes the paid amount of every row and the status of every other row.
+    """
+    create, update = tmp / "create.csv", tmp / "update.csv"
+    with src.open(newline="", encoding="utf-8") as fin, \
+            create.open("w", newline="", encoding="utf-8") as fc, \
+            update.open("w", newline="", encoding="utf-8") as fu:
+        reader = csv.reader(fin, delimiter=delimiter)
+        header = next(reader)
+        col = {h: i for i, h in enumerate(header)}
+        wc, wu = csv.writer(fc, delimiter=delimiter), csv.writer(fu, delimiter=delimiter)
+        wc.writerow(header)
+        wu.writerow(header)
+        n = 0
+        for n, row in enumerate(reader, 1):
+            row[0] = ID_PREFIX + row[0]
+            wc.writerow(row)
+            if "paid_amount" in col:
+                row[col["paid_amount"]] = f"{float(row[col['paid_amount']] or 0) + 1:.2f}"
+            if "status" in col and n % 2:
+                row[col["status"]] = "Paid" if row[col["status"]] != "Paid" else "Denied"
+            wu.writerow(row)
+    return create, update, n
+
+
+class Command(BaseCommand):
+    help = ("load_claims throughput with the claim change log off and on, over one fixed input "
+            "(default: data/claims.csv) loaded as new claims and then updated. Every round runs "
+            "in a transaction that is rolled back, so the database is left as it was and runs "
+            "are comparable. Fails when the overhead exceeds --max-overhead.")
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("path", nargs="?", default="data/claims.csv")
+        parser.add_argument("--delimiter", default="|")
+        parser.add_argument("--rounds", type=int, default=3)
+        parser.add_argument("--max-overhead", type=float, default=15.0,
+                            help="Allowed throughput loss with the log on, in percent (default: 15).")
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        src = Path(opts["path"]).resolve()
+        if not src.is_file():
+            raise CommandError(f"File not found: {src}")
+
+        timings = {False: [], True: []}
+        with tempfile.TemporaryDirectory(prefix="bench_audit_") as tmp:
+            create, update, rows = _write_passes(src, Path(tmp), opts["delimiter"])
+            for r in range(opts["rounds"]):
+                # Alternate the order so neither setting always runs on a warmer cache.
+                for audit in ((False, True) if r % 2 == 0 else (True, False)):
+                    timings[audit].append(self._run(create, update, opts["delimiter"], audit))
+
+        off, on = statistics.median(timings[False]), statistics.median(timings[True])
+        overhead = (on - off) / off * 100
+        self.stdout.write(f"{src.name}: {rows} rows created then updated, {opts['rounds']} rounds (median)")
+        for label, t in (("audit off", off), ("audit on", on)):
+            self.stdout.write(f"{label:<10} {2 * rows / t:>8.0f} rows/s  {t / (2 * rows) * 1e6:>7.1f} us/row")
+        msg = f"overhead {overhead:.1f}% (target <= {opts['max_overhead']:g}%)"
+        if overhead > opts["max_overhead"]:
+            raise CommandError(msg)
+        self.stdout.write(self.style.SUCCESS(msg))
+
+    @staticmethod
+    def _run(create: Path, update: Path, delimiter: str, audit: bool) -> float:
+        out = io.StringIO()
+        with override_settings(CLAIM_AUDIT=audit), transaction.atomic(using=tenants.db()):
+            t0 = time.perf_counter()
+            for path in (create, update):
+                call_command("load_claims", str(path), delimiter=delimiter, reset_notes="keep",
+                             tenant=tenants.current(), stdout=out)
+            elapsed = time.perf_counter() - t0
+            transaction.set_rollback(True, using=tenants.db())
+        return elapsed
@@ -0,0 +1,61 @@
+# claims/management/commands/bench_duplicates.py
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from claims.dedupe import DupRecord, find_duplicates, name_key
+
+FIRST = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Susan",
+         "William", "Karen", "Richard", "Nancy", "Joseph", "Lisa", "Thomas", "Betty", "Charles", "Sandra"]
+LAST = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+        "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin"]
+INSURERS = ["aetna", "blue cross", "cigna", "self funded inc.", "united healthcare"]
+CPTS = ["99204", "82947", "99406", "90834", "90837", "99213", "99214", "80053", "85025", "93000"]
+
+
+def synthetic_records(n, days, dup_rate, seed=0):
+    """Yield n DupRecords in discharge_date order, ~dup_rate of them resubmissions."""
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    per_day = max(n // days, 1)
+    pk = 0
+    while pk < n:
+        d = start + timedelta(days=pk // per_day)
+        batch = []
+        for _ in range(min(per_day, n - pk)):
+            pk += 1
+            if batch and rng.random() < dup_rate:
+                src = rng.choice(batch)
+                batch.append(src._replace(pk=pk, claim_id=f"C{pk}"))
+                continue
+            name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.randrange(1000)}"
+            batch.append(DupRecord(pk, f"C{pk}", name_key(name), d,
+                                   Decimal(rng.randrange(10_000, 1_000_000)) / 100,
+                                   rng.choice(INSURERS), tuple(sorted(rng.sample(CPTS, rng.randint(1, 4))))))
+        yield from batch
+
+
+class Command(BaseCommand):
+    help = "Benchmark duplicate detection on synthetic claims (no DB) to check near-linear scaling."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="100000,500000,1000000,5000000",
+                            help="Comma-separated claim counts.")
+        parser.add_argument("--days", type=int, default=1500, help="Distinct discharge dates.")
+        parser.add_argument("--dup-rate", type=float, default=0.01)
+
+    def handle(self, *args, **opts):
+        sizes = [int(s) for s in opts["sizes"].split(",") if s.strip()]
+        base = None
+        self.stdout.write(f"{'claims':>10} {'seconds':>9} {'claims/s':>10} {'pairs':>8} {'us/claim':>9} {'vs first':>8}")
+        for n in sizes:
+            t0 = time.perf_counter()
+            pairs = sum(1 for _ in find_duplicates(
+                synthetic_records(n, opts["days"], opts["dup_rate"]), threshold=0.9))
+            dt = time.perf_counter() - t0
+            per = dt * 1e6 / n
+            base = base or per
+            self.stdout.write(f"{n:>10} {dt:>9.2f} {n / dt:>10.0f} {pairs:>8} {per:>9.2f} {per / base:>7.2f}x")
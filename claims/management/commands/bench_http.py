@@ -0,0 +1,115 @@
+# claims/management/commands/bench_http.py
+import http.client
+import statistics
+import time
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from claims.models import Claim
+
+ENCODINGS = {"identity": "identity", "gzip": "gzip", "br": "br, gzip"}
+
+
+def _targets():
+    """(label, path, extra headers) for the views worth measuring."""
+    from django.templatetags.static import static
+    from django.urls import reverse
+
+    pks = list(Claim.objects.order_by("pk").values_list("pk", flat=True)[:50])
+    pk = pks[0] if pks else None
+    hx = {"HX-Request": "true"}
+    targets = [
+        ("index page", reverse("claims:index"), {}),
+        ("table fragment", reverse("claims:index") + "?page=2", hx),
+        ("search fragment", reverse("claims:index") + "?q=jo", hx),
+        ("analytics", reverse("claims:analytics_dashboard"), {}),
+        ("app.css", static("claims/app.css"), {}),
+        ("htmx.js", static("claims/vendor/htmx-1.9.10.min.js"), {}),
+    ]
+    if pk:
+        targets.insert(3, ("claim detail", reverse("claims:claim_detail", args=[pk]), hx))
+        targets.insert(4, ("50 panels", reverse("claims:claim_details") + "?pks=" + ",".join(map(str, pks)), {}))
+    return targets
+
+
+class Command(BaseCommand):
+    help = ("Bytes on the wire and time to first byte per view and Accept-Encoding. "
+            "In-process through the full middleware stack (with CLAIM_THROTTLE off, so the "
+            "views themselves are measured) by default, or against a running server with --base-url.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--base-url", default="", help="e.g. http://127.0.0.1:8000")
+        parser.add_argument("--encodings", default="identity,gzip,br")
+
+    def handle(self, *args, **opts):
+        fetch = self._http_fetch(opts["base_url"]) if opts["base_url"] else self._client_fetch()
+        encodings = [e.strip() for e in opts["encodings"].split(",") if e.strip()]
+
+        self.stdout.write(f"{'view':<16} {'encoding':<9} {'status':>6} {'bytes':>8} "
+                          f"{'ttfb_ms':>8} {'total_ms':>9}")
+        # Back-to-back requests from one client would soon get 429s of ~100 bytes.
+        with nullcontext() if opts["base_url"] else override_settings(CLAIM_THROTTLE={}):
+            self._run(fetch, encodings, opts["rounds"])
+
+    def _run(self, fetch, encodings, rounds):
+        for label, path, headers in _targets():
+            for enc in encodings:
+                hdrs = dict(headers, **{"Accept-Encoding": ENCODINGS.get(enc, enc)})
+                if fetch(path, hdrs)[0] == 404 and path.startswith(settings.STATIC_URL):  # warm-up
+                    self.stdout.write(f"{label:<16} (static files are not served in-process; use --base-url)")
+                    break
+                samples = [fetch(path, hdrs) for _ in range(rounds)]
+                status, size, got = samples[-1][:3]
+                shed = sum(s[0] in (429, 503) for s in samples)
+                ttfb = statistics.median(s[3] for s in samples) * 1000
+                total = statistics.median(s[4] for s in samples) * 1000
+                self.stdout.write(f"{label:<16} {got or 'identity':<9} {status:>6} {size:>8} "
+                                  f"{ttfb:>8.2f} {total:>9.2f}")
+                if shed:
+                    self.stdout.write(self.style.WARNING(
+                        f"{'':<16} {shed}/{rounds} responses were shed (429/503) by the server's throttle"))
+
+    @staticmethod
+    def _client_fetch():
+        """In-process: first byte == response returned by the handler."""
+        from django.test import Client
+
+        client = Client(HTTP_HOST="localhost")
+
+        def fetch(path, headers):
+            meta = {"HTTP_" + k.upper().replace("-", "_"): v for k, v in headers.items()}
+            t0 = time.perf_counter()
+            resp = client.get(path, **meta)
+            ttfb = time.perf_counter() - t0
+            body = b"".join(resp.streaming_content) if resp.streaming else resp.content
+            total = time.perf_counter() - t0
+            return resp.status_code, len(body), resp.get("Content-Encoding", ""), ttfb, total
+
+        return fetch
+
+    @staticmethod
+    def _http_fetch(base_url):
+        """Over a socket: bytes are the (still encoded) body as sent."""
+        parts = urlsplit(base_url)
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+
+        def fetch(path, headers):
+            conn = conn_cls(parts.netloc, timeout=30)
+            try:
+                t0 = time.perf_counter()
+                conn.request("GET", parts.path.rstrip("/") + path, headers=headers)
+                resp = conn.getresponse()
+                first = resp.read(1)
+                ttfb = time.perf_counter() - t0
+                body_len = len(first) + len(resp.read())
+                total = time.perf_counter() - t0
+                return resp.status, body_len, resp.getheader("Content-Encoding", ""), ttfb, total
+            finally:
+                conn.close()
+
+        return fetch
@@ -0,0 +1,155 @@
+# claims/management/commands/bench_ingest.py
+import bz2
+import gzip
+import lzma
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _write_zst(src: Path, dst: Path):
+    import zstandard
+
+    with src.open("rb") as fin, dst.open("wb") as fout:
+        zstandard.ZstdCompressor(level=3).copy_stream(fin, fout)
+
+
+def _write_zip(src: Path, dst: Path):
+    with zipfile.ZipFile(dst, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(src, src.name)
+
+
+def _write_with(opener):
+    def write(src: Path, dst: Path):
+        with src.open("rb") as fin, opener(dst, "wb") as fout:
+            shutil.copyfileobj(fin, fout)
+    return write
+
+
+# label -> (suffix, writer); default compression levels, as payers would send them
+VARIANTS = {
+    "gzip": (".gz", _write_with(gzip.open)),
+    "bz2": (".bz2", _write_with(bz2.open)),
+    "xz": (".xz", _write_with(lzma.open)),
+    "zstd": (".zst", _write_zst),
+    "zip": (".zip", _write_zip),
+}
+
+
+class Command(BaseCommand):
+    help = ("Parse throughput of the loaders' read phase (no DB writes): rows/s and bytes per "
+            "parsed row held for the write phase, then a plain file vs the same file "
+            "gzip/bz2/xz/zstd-compressed or zipped, streamed through claims.ingest. "
+            "'extract+read' is the old workflow: decompress to disk, then read the plain copy.")
+
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="data/claims.csv")
+        parser.add_argument("--kind", choices=["claims", "details"], default="claims")
+        parser.add_argument("--delimiter", default="|")
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument("--variants", default=",".join(VARIANTS),
+                            help="Compressed variants to compare; '' for the row numbers only.")
+
+    def handle(self, *args, **opts):
+        from claims.ingest import Source, open_binary
+
+        src = Path(opts["path"]).resolve()
+        if not src.is_file():
+            raise CommandError(f"File not found: {src}")
+        read = self._reader(opts)
+        raw_bytes = src.stat().st_size
+
+        with tempfile.TemporaryDirectory(prefix="bench_ingest_") as tmp:
+            tmp = Path(tmp)
+            plain = tmp / src.name
+            shutil.copyfile(src, plain)
+            rows, base = self._time(lambda: read(Source(plain)), opts["rounds"])
+            held, peak = self._memory(lambda: read(Source(plain), keep=True))
+            self.stdout.write(f"{src.name}: {rows} rows, {raw_bytes / 1e6:.2f} MB uncompressed, "
+                              f"{opts['rounds']} rounds (median)")
+            self.stdout.write(f"parse: {rows / base:.0f} rows/s, {base / rows * 1e6:.1f} us/row; "
+                              f"parsed rows hold {held / rows:.0f} bytes/row (peak {peak / rows:.0f})\n")
+            if not opts["variants"]:
+                return
+            self.stdout.write(f"{'input':<8} {'on disk':>9} {'ratio':>6} {'MB/s':>7} {'rows/s':>9} "
+                              f"{'vs plain':>8} {'extract+read':>13}")
+            self._line("plain", raw_bytes, raw_bytes, rows, base, base, None)
+
+            for label in [v.strip() for v in opts["variants"].split(",") if v.strip()]:
+                if label not in VARIANTS:
+                    raise CommandError(f"Unknown variant {label!r}; choose from {', '.join(VARIANTS)}.")
+                suffix, write = VARIANTS[label]
+                packed = tmp / (src.name + suffix)
+                try:
+                    write(src, packed)
+                except ImportError as e:
+                    self.stdout.write(f"{label:<8} skipped ({e.name} not installed)")
+                    continue
+                source = Source(packed, src.name) if label == "zip" else Source(packed)
+                _, streamed = self._time(lambda: read(source), opts["rounds"])
+
+                def extract_then_read():
+                    out = tmp / ("extracted_" + src.name)
+                    with open_binary(source) as fin, out.open("wb") as fout:
+                        shutil.copyfileobj(fin, fout, 1 << 20)
+                    n = read(Source(out))
+                    out.unlink()
+                    return n
+
+                _, extracted = self._time(extract_then_read, opts["rounds"])
+                self._line(label, packed.stat().st_size, raw_bytes, rows, streamed, base, extracted)
+
+    @staticmethod
+    def _reader(opts):
+        """read(source, keep=False): row count (or the parsed rows), via the command's own read phase."""
+        if opts["kind"] == "details":
+            from claims.management.commands.load_details import Command as Details
+
+            def parse(s):
+                return Details.read_file(s, opts["delimiter"])
+        else:
+            from claims.management.commands.load_claims import Command as Claims
+
+            cmd = Claims()
+            read_opts = {"format": "auto", "delimiter": opts["delimiter"]}
+
+            def parse(s):
+                return cmd.read_file(s, read_opts)[1]
+
+        return lambda s, keep=False: parse(s) if keep else len(parse(s))
+
+    @staticmethod
+    def _memory(parse):
+        """(bytes still held by the parsed rows, peak bytes while parsing) under tracemalloc."""
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            parsed = parse()
+            held, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del parsed
+        return held - base, peak - base
+
+    @staticmethod
+    def _time(fn, rounds):
+        fn()  # warm page cache and imports
+        samples, result = [], None
+        for _ in range(max(rounds, 1)):
+            t0 = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - t0)
+        return result, statistics.median(samples)
+
+    def _line(self, label, disk, raw, rows, secs, base, extracted):
+        extra = f"{extracted * 1000:>10.0f} ms" if extracted is not None else f"{'-':>13}"
+        self.stdout.write(f"{label:<8} {disk / 1e6:>7.2f}MB {raw / disk:>6.1f} {raw / 1e6 / secs:>7.1f} "
+                          f"{rows / secs:>9.0f} {secs / base:>7.2f}x {extra}")
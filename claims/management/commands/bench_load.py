@@ -0,0 +1,151 @@
+# claims/management/commands/bench_load.py
+import http.client
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from claims.models import Claim
+
+WORDS = ["a", "e", "s", "an", "jo", "mar", "son", "smith", "cigna", "aetna", "united", "3000", "30001"]
+
+
+def _percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = ("Overload the claims list and detail panel with concurrent reviewers (no think time; "
+            "Retry-After is honoured) and report status counts and latency percentiles, with "
+            "CLAIM_THROTTLE off and on. "
+            "In-process by default, or against a running server with --base-url.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=16, help="Concurrent reviewers.")
+        parser.add_argument("--seconds", type=float, default=10.0, help="Duration of each run.")
+        parser.add_argument("--detail-share", type=float, default=0.3,
+                            help="Fraction of requests that open a detail panel; the rest search.")
+        parser.add_argument("--base-url", default="",
+                            help="e.g. http://127.0.0.1:8000 (one run, with the server's own settings)")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **opts):
+        pks = list(Claim.objects.values_list("pk", flat=True)[:5000])
+        if not pks:
+            self.stderr.write("No claims loaded.")
+            return
+        self.index_url = reverse("claims:index")
+
+        self.stdout.write(f"{'run':<11} {'reqs':>6} {'req/s':>7} {'200':>6} {'429':>5} {'503':>5} "
+                          f"{'p50_ms':>7} {'p95_ms':>7} {'p99_ms':>7} {'max_ms':>7} {'200_p99':>8}")
+        if opts["base_url"]:
+            self._run("server", opts, pks, self._http_client(opts["base_url"]))
+            return
+        with override_settings(CLAIM_THROTTLE={}):
+            self._run("unthrottled", opts, pks, self._test_client)
+        self._run("throttled", opts, pks, self._test_client)
+
+    def _run(self, label, opts, pks, make_client):
+        stop_at = time.perf_counter() + opts["seconds"]
+        results = []  # (status, seconds)
+        lock = threading.Lock()
+
+        def reviewer(i):
+            rnd = random.Random(opts["seed"] * 1000 + i)
+            fetch = make_client(i)
+            mine = []
+            try:
+                while time.perf_counter() < stop_at:
+                    if rnd.random() < opts["detail_share"]:
+                        path = reverse("claims:claim_detail", args=[rnd.choice(pks)])
+                    else:
+                        q = " ".join(rnd.sample(WORDS, rnd.randint(1, 2)))
+                        path = f"{self.index_url}?{urlencode({'q': q, 'page': rnd.randint(1, 3)})}"
+                    t0 = time.perf_counter()
+                    status, retry_after = fetch(path)
+                    mine.append((status, time.perf_counter() - t0))
+                    if retry_after:  # like app.js: wait as told, then go on
+                        time.sleep(min(retry_after, max(0.0, stop_at - time.perf_counter())))
+            finally:
+                connections.close_all()
+                with lock:
+                    results.extend(mine)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=reviewer, args=(i,)) for i in range(opts["clients"])]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+
+        counts = Counter(s for s, _ in results)
+        all_ms = [d * 1000 for _, d in results]
+        ok_ms = [d * 1000 for s, d in results if s == 200]
+        self.stdout.write(
+            f"{label:<11} {len(results):>6} {len(results) / elapsed:>7.1f} {counts[200]:>6} {counts[429]:>5} "
+            f"{counts[503]:>5} {statistics.median(all_ms) if all_ms else 0:>7.1f} "
+            f"{_percentile(all_ms, 95):>7.1f} {_percentile(all_ms, 99):>7.1f} {max(all_ms, default=0):>7.1f} "
+            f"{_percentile(ok_ms, 99):>8.1f}")
+        other = {s: n for s, n in counts.items() if s not in (200, 429, 503)}
+        if other:
+            self.stdout.write(f"{'':<11} other statuses: {other}")
+
+    @staticmethod
+    def _test_client(i):
+        """In-process; each reviewer is its own client address (and so its own rate bucket)."""
+        from django.test import Client
+
+        client = Client(HTTP_HOST="localhost", REMOTE_ADDR=f"10.0.{i // 250}.{i % 250 + 1}")
+
+        def fetch(path):
+            resp = client.get(path, HTTP_HX_REQUEST="true")
+            return resp.status_code, int(resp.get("Retry-After") or 0)
+
+        return fetch
+
+    def _http_client(self, base_url):
+        parts = urlsplit(base_url)
+        conn_cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        prefix = parts.path.rstrip("/")
+        index_url = self.index_url
+
+        def make(i):
+            """Over a socket; each reviewer first opens the list page to get its own session."""
+            conn = conn_cls(parts.netloc, timeout=60)
+            headers = {"HX-Request": "true"}
+
+            def request(path, hdrs):
+                nonlocal conn
+                try:
+                    conn.request("GET", prefix + path, headers=hdrs)
+                    resp = conn.getresponse()
+                except (OSError, http.client.HTTPException):
+                    conn.close()
+                    conn = conn_cls(parts.netloc, timeout=60)
+                    return 0, None
+                resp.read()
+                return resp.status, resp
+
+            _, resp = request(index_url, {})
+            for cookie in (resp.msg.get_all("Set-Cookie") if resp else None) or []:
+                if cookie.startswith("sessionid="):
+                    headers["Cookie"] = cookie.split(";", 1)[0]
+
+            def fetch(path):
+                status, resp = request(path, headers)
+                return status, int((resp.getheader("Retry-After") if resp else None) or 0)
+
+            return fetch
+
+        return make
@@ -0,0 +1,45 @@
+# claims/management/commands/bench_templates.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from claims.models import Claim
+
+
+class Command(BaseCommand):
+    help = "Benchmark rendering of the claims table fragment (microseconds per row, DB excluded)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=300)
+        parser.add_argument("--warmup", type=int, default=20)
+
+    def handle(self, *args, **opts):
+        from django.template.loader import render_to_string
+        from django.test import RequestFactory
+
+        from claims.views import _index_context, _with_display_fields
+
+        if not Claim.objects.exists():
+            self.stderr.write("No claims loaded; run load_claims first.")
+            return
+        request = RequestFactory().get("/user/", HTTP_HX_REQUEST="true")
+        ctx = _index_context(request)  # runs the page query once, outside the timed loop
+        page = ctx["claims"]
+        rows = len(page)
+
+        def render():
+            ctx["claims"] = _with_display_fields(page)
+            return render_to_string("claims/_claim_table.html", ctx, request=request)
+
+        for _ in range(opts["warmup"]):
+            render()
+        t0 = time.perf_counter()
+        for _ in range(opts["rounds"]):
+            html = render()
+        dt = time.perf_counter() - t0
+
+        per_render = dt * 1e6 / opts["rounds"]
+        self.stdout.write(
+            f"rows={rows} renders={opts['rounds']} "
+            f"us/render={per_render:.0f} us/row={per_render / rows:.1f} bytes={len(html.encode())}"
+        )
@@ -0,0 +1,53 @@
+# claims/management/commands/claim_history.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from claims import tenants
+from claims.audit import state_at
+from claims.models import Claim, ClaimChange
+
+
+class Command(BaseCommand):
+    help = "Show a claim's change log, or its state at a point in time with --at."
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("claim_id")
+        parser.add_argument("--at", default="",
+                            help="ISO timestamp or date (end of day); prints the reconstructed state.")
+
+    @staticmethod
+    def _parse_at(value: str):
+        dt = parse_datetime(value)
+        if dt is None:
+            d = parse_date(value)
+            if d is None:
+                raise CommandError(f"Cannot parse --at {value!r}.")
+            dt = timezone.datetime.combine(d, timezone.datetime.max.time())
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt)
+        return dt
+
+    @tenants.tenant_command
+    def handle(self, claim_id, *args, **opts):
+        pk = Claim.objects.filter(claim_id=claim_id).values_list("pk", flat=True).first()
+        if pk is None:
+            raise CommandError(f"Claim {claim_id} not found.")
+
+        if opts["at"]:
+            at = self._parse_at(opts["at"])
+            state = state_at(pk, at)
+            if state is None:
+                self.stdout.write(f"Claim {claim_id} did not exist at {at.isoformat()}.")
+                return
+            self.stdout.write(f"Claim {claim_id} as of {at.isoformat()}:")
+            for field, value in state.items():
+                self.stdout.write(f"  {field}: {value!r}")
+            return
+
+        changes = ClaimChange.objects.filter(claim_pk=pk).order_by("changed_at", "pk")
+        for ch in changes.iterator():
+            fields = ", ".join(f"{f}: {old!r} -> {new!r}" for f, (old, new) in ch.changes.items())
+            self.stdout.write(f"{ch.changed_at:%Y-%m-%d %H:%M:%S} {ch.get_op_display():<18} "
+                              f"{ch.source:<14} {fields}")
@@ -0,0 +1,41 @@
+# claims/management/commands/compact_audit.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from claims import tenants
+from claims.audit import compact_month, month_key
+from claims.models import ClaimChange
+
+
+class Command(BaseCommand):
+    help = ("Compact the claim change log: merge each claim's changes within a month partition "
+            "into one row. Only finished months are touched by default.")
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("--month", action="append", default=[],
+                            help="Partition to compact (YYYY-MM); repeatable.")
+        parser.add_argument("--before", default="",
+                            help="Compact every partition older than this month (default: current month).")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        months = opts["month"]
+        if not months:
+            before = opts["before"] or month_key(timezone.now())
+            months = list(ClaimChange.objects.filter(month__lt=before)
+                          .order_by("month").values_list("month", flat=True).distinct())
+        for m in months:
+            if len(m) != 7 or m[4] != "-":
+                raise CommandError(f"Bad month {m!r}; expected YYYY-MM.")
+
+        total_before = total_after = 0
+        for m in months:
+            rows_before, rows_after = compact_month(m, batch_size=opts["batch_size"])
+            total_before += rows_before
+            total_after += rows_after
+            self.stdout.write(f"{m}: {rows_before} -> {rows_after} rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Compacted {len(months)} partition(s): {total_before} -> {total_after} rows"
+        ))
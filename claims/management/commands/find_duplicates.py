@@ -0,0 +1,127 @@
+# claims/management/commands/find_duplicates.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from claims import tenants
+from claims.models import Claim, Note
+
+NOTE_PREFIX = "Possible duplicate of claim "
+
+
+def _note_head(pair) -> str:
+    """The note's text up to the score, which may differ between runs."""
+    return f"{NOTE_PREFIX}{pair.original.claim_id} ("
+
+
+class Command(BaseCommand):
+    help = (
+        "Find likely resubmitted (duplicate) claims by blocking on patient + discharge date "
+        "and CPT set. High-confidence hits are flagged for review, as Flag for Review does, with an "
+        "explanatory note; a pair noted by an earlier run is left alone."
+    )
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("--threshold", type=float, default=0.7,
+                            help="Minimum score to report a candidate pair (default: 0.7).")
+        parser.add_argument("--flag-threshold", type=float, default=0.9,
+                            help="Minimum score to flag the newer claim for review (default: 0.9).")
+        parser.add_argument("--max-block", type=int, default=50,
+                            help="Skip blocks larger than this (default: 50).")
+        parser.add_argument("--chunk-size", type=int, default=5000,
+                            help="DB fetch chunk size (default: 5000).")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Flag/notes write batch size (default: 500).")
+        parser.add_argument("--author", default="Duplicate check",
+                            help="author_name for generated notes.")
+        parser.add_argument("--stream", action="store_true",
+                            help="Print every candidate pair as it is found.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report only; do not flag claims or add notes.")
+
+    def _records(self, chunk_size):
+        from claims.dedupe import make_record
+
+        rows = (Claim.objects
+                .order_by("discharge_date", "pk")
+                .values_list("pk", "claim_id", "patient_name", "discharge_date",
+                             "billed_amount", "insurer_id", "detail_info")
+                .iterator(chunk_size=chunk_size))
+        for row in rows:
+            yield make_record(*row)
+
+    def _flag(self, pairs, author):
+        # Only needed when something gets flagged (never on --dry-run).
+        from claims import events
+        from claims.audit import AuditLog
+        from claims.queues import QUEUE_FIELDS, QueueDelta
+        from claims.rollups import ROLLUP_FIELDS, RollupDelta
+
+        by_pk = {p.duplicate.pk: p for p in pairs}
+        rollup = RollupDelta()
+        queue = QueueDelta()
+        audit = AuditLog("find_duplicates")
+        with transaction.atomic(using=tenants.db()):
+            # A pair noted by an earlier run is not flagged again: once a reviewer
+            # clears the flag it stays cleared, and the note is not repeated.
+            noted = set(Note.objects.filter(claim_id__in=by_pk, author_name=author,
+                                            body__startswith=NOTE_PREFIX).values_list("claim_id", "body"))
+            noted = {pk for pk, body in noted if body.startswith(_note_head(by_pk[pk]))}
+            fields = dict.fromkeys(ROLLUP_FIELDS + QUEUE_FIELDS)
+            snaps = list(Claim.objects.filter(pk__in=set(by_pk) - noted, need_review=False)
+                         .values("pk", *fields))
+            if not snaps:
+                return 0
+            notes = []
+            for snap in snaps:
+                pk = snap.pop("pk")
+                # The same change flag_set makes from the detail panel.
+                after = dict(snap, need_review=True, status=Claim.Status.UNDER_REVIEW.value)
+                rollup.change(snap, after)
+                queue.change(pk, snap, after)
+                audit.record(pk, snap, after)
+                p = by_pk[pk]
+                notes.append(Note(claim_id=pk, author_name=author, body=f"{_note_head(p)}score {p.score:.2f})."))
+            Claim.objects.filter(pk__in=[n.claim_id for n in notes]).update(
+                need_review=True, status=Claim.Status.UNDER_REVIEW.value)
+            Note.objects.bulk_create(notes)
+            rollup.apply()
+            queue.apply()
+            audit.flush()
+            for claim in Claim.objects.filter(pk__in=[n.claim_id for n in notes]).only("id", "need_review", "status"):
+                events.publish_flag(claim)
+        return len(notes)
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        from claims.dedupe import find_duplicates
+
+        dry_run = opts["dry_run"]
+        flag_threshold = opts["flag_threshold"]
+        candidates = 0
+        high = 0
+        flagged = 0
+        pending = []
+
+        for pair in find_duplicates(self._records(opts["chunk_size"]),
+                                    threshold=min(opts["threshold"], flag_threshold),
+                                    max_block=opts["max_block"]):
+            candidates += 1
+            if opts["stream"]:
+                self.stdout.write(f"{pair.original.claim_id}\t{pair.duplicate.claim_id}\t{pair.score:.2f}")
+            if pair.score < flag_threshold:
+                continue
+            high += 1
+            if dry_run:
+                continue
+            pending.append(pair)
+            if len(pending) >= opts["batch_size"]:
+                flagged += self._flag(pending, opts["author"])
+                pending = []
+
+        if pending:
+            flagged += self._flag(pending, opts["author"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. candidates={candidates}, high_confidence={high}, flagged={flagged}, dry_run={dry_run}"
+        ))
@@ -0,0 +1,71 @@
+# claims/management/commands/ingest.py
+from django.core.management.base import BaseCommand, CommandError
+
+from claims import tenants
+from claims.management.commands import load_claims, load_details
+
+
+class Command(BaseCommand):
+    help = ("Load a payer drop in one run: every claims file, then every detail file. "
+            "Both phases share one claim_id -> pk map, and the next file is parsed while the "
+            "current one is written. One transaction and one report line per file.")
+    # Set by the job runner (claims.jobs): progress(done, total)
+    stealth_options = ("progress",)
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("--claims", nargs="+", default=[], metavar="PATH",
+                            help="Claims CSV/JSON files, directories or glob patterns (quote globs).")
+        parser.add_argument("--details", nargs="+", default=[], metavar="PATH",
+                            help="Detail CSV files, directories or glob patterns.")
+        parser.add_argument("--delimiter", default="|", help="Claims CSV delimiter (default: '|').")
+        parser.add_argument("--details-delimiter", default="",
+                            help="Detail CSV delimiter (default: same as --delimiter).")
+        parser.add_argument("--format", choices=["auto", "csv", "json"], default="auto")
+        parser.add_argument("--reset-notes", choices=["all", "file", "keep"], default="keep",
+                            help="As load_claims, applied to the claims phase. Default: keep, unlike "
+                                 "load_claims (all), so a payer drop never wipes every claim's notes.")
+        parser.add_argument("--reset-needreview", choices=["all", "file"])
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument("--id-cache-size", type=int, default=200_000,  # claims.ingest.DEFAULT_ID_CACHE
+                            help="Max claim_id -> pk entries kept across files (default: 200000).")
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        from claims.ingest import DEFAULT_ID_CACHE, ClaimIdMap, expand_paths, run_files
+
+        if not opts["claims"] and not opts["details"]:
+            raise CommandError("Nothing to load: pass --claims and/or --details.")
+        idmap = ClaimIdMap(opts["id_cache_size"] or DEFAULT_ID_CACHE)
+
+        claims_cmd = load_claims.Command(stdout=self.stdout, stderr=self.stderr)
+        details_cmd = load_details.Command(stdout=self.stdout, stderr=self.stderr)
+        details_opts = dict(opts, delimiter=opts["details_delimiter"] or opts["delimiter"])
+        steps = []
+        if opts["claims"]:
+            steps += claims_cmd.steps(expand_paths(opts["claims"], load_claims.CLAIM_SUFFIXES), opts, idmap)
+        if opts["details"]:
+            steps += details_cmd.steps(expand_paths(opts["details"], load_details.DETAIL_SUFFIXES),
+                                       details_opts, idmap)
+
+        reports = run_files(self, steps, opts.get("progress"))
+
+        for kind in ("claims", "details"):
+            done = [r for r in reports if r.kind == kind and not r.error]
+            if not any(r.kind == kind for r in reports):
+                continue
+            if kind == "claims":
+                counts = (f"created={sum(r.created for r in done)} updated={sum(r.updated for r in done)} "
+                          f"skipped={sum(r.skipped for r in done)}")
+            else:
+                counts = f"updated={sum(r.updated for r in done)} missing={sum(r.missing for r in done)}"
+            self.stdout.write(self.style.SUCCESS(
+                f"{kind}: files={len(done)}/{sum(r.kind == kind for r in reports)} "
+                f"rows={sum(r.rows for r in done)} {counts}"))
+        self.stdout.write(f"id map: {len(idmap)} entries, {idmap.hits} hits, {idmap.misses} misses"
+                          f"{' (dry run)' if opts['dry_run'] else ''}")
+
+        failed = sum(1 for r in reports if r.error)
+        if failed:
+            raise CommandError(f"{failed} of {len(reports)} files failed.")
@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 import csv
-import json
+import io
 import re
-from pathlib import Path
+import sys
+from itertools import chain
 from decimal import Decimal, InvalidOperation
 from datetime import datetime, date
 
@@ -12,17 +13,153 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.db.models import Q
 
-from claims.models import Claim, Note
+from claims import tenants
+from claims.dimensions import normalize_status
+from claims.models import Claim, Note, ClaimRollup
+
+# What a directory argument picks up.
+CLAIM_SUFFIXES = (".csv", ".tsv", ".txt", ".json", ".ndjson")  # also compressed / in zips
+
+# Accepted input column names per field, first non-empty wins.
+CLAIM_ID_KEYS = ("claim_id", "id", "Claim ID", "claimId")
+FIELD_KEYS = {
+    "patient_name": ("patient_name", "patient", "Patient"),
+    "billed_amount": ("billed_amount", "billed"),
+    "paid_amount": ("paid_amount", "paid"),
+    "status": ("status",),
+    "insurer": ("insurer", "insurer_name", "payer"),
+    "discharge_date": ("discharge_date", "date_of_service", "dos"),
+}
+
+
+def _first(row, idxs) -> str:
+    """First non-empty stripped value among the column indexes `idxs` of a row sequence."""
+    n = len(row)
+    for i in idxs:
+        if i < n:
+            v = row[i]
+            if v is not None:
+                v = (v if type(v) is str else str(v)).strip()
+                if v:
+                    return v
+    return ""
+
+
+class ColumnMap:
+    """A header resolved once to column indexes: each field's aliases, in priority order."""
+
+    __slots__ = ("claim_id", *FIELD_KEYS)
+
+    def __init__(self, header):
+        pos = {(h or "").strip(): i for i, h in enumerate(header)}
+        self.claim_id = tuple(pos[k] for k in CLAIM_ID_KEYS if k in pos)
+        for field, keys in FIELD_KEYS.items():
+            setattr(self, field, tuple(pos[k] for k in keys if k in pos))
+
+
+class ClaimRecord:
+    """One parsed input row, held between the reader thread and the writer."""
+
+    __slots__ = ("claim_id", *FIELD_KEYS)
+
+    def __init__(self, claim_id, patient_name, billed_amount, paid_amount, status, insurer, discharge_date):
+        self.claim_id = claim_id
+        self.patient_name = patient_name
+        self.billed_amount = billed_amount
+        self.paid_amount = paid_amount
+        self.status = status
+        self.insurer = insurer
+        self.discharge_date = discharge_date
+
+    def defaults(self, insurer_ids: dict) -> dict:
+        """update_or_create defaults; `insurer_ids` maps raw insurer names to Insurer ids."""
+        defaults = {}
+        if self.patient_name:
+            defaults["patient_name"] = self.patient_name
+        if self.billed_amount is not None:
+            defaults["billed_amount"] = self.billed_amount
+        if self.paid_amount is not None:
+            defaults["paid_amount"] = self.paid_amount
+        if self.status:
+            defaults["status"] = self.status
+        # Blank values above keep the stored ones; insurer and discharge date always take the file's.
+        defaults["insurer_id"] = insurer_ids[self.insurer]
+        defaults["discharge_date"] = self.discharge_date
+        return defaults
+
+
+class RowParser:
+    """
+    Row sequences -> ClaimRecords for one file. Statuses, insurers and dates
+    repeat across thousands of rows, so each distinct raw value is normalized
+    once and every record shares the same (interned) object. Insurer names stay
+    raw here (no DB on the reader thread); the writer resolves each distinct
+    name to an Insurer id once.
+    """
+
+    def __init__(self):
+        self._status: dict[str, str | None] = {}
+        self.unknown_status: dict[str, int] = {}  # raw value -> rows, status left unchanged
+        self._dates: dict[str, date | None] = {}
+        self._columns: dict[tuple, ColumnMap] = {}
+
+    def columns(self, keys: tuple) -> ColumnMap:
+        """ColumnMap for a key tuple (JSON rows), built once per distinct key set."""
+        cols = self._columns.get(keys)
+        if cols is None:
+            cols = self._columns[keys] = ColumnMap(keys)
+        return cols
+
+    def record(self, cols: ColumnMap, row) -> ClaimRecord | None:
+        cid = _first(row, cols.claim_id)
+        if not cid:
+            return None
+        status = raw_status = _first(row, cols.status)
+        if status in self._status:
+            status = self._status[status]
+        else:
+            norm = Command._norm_status(status)
+            self._status[status] = sys.intern(norm) if norm else None
+            status = self._status[status]
+        if status is None and raw_status:
+            self.unknown_status[raw_status] = self.unknown_status.get(raw_status, 0) + 1
+        dos = _first(row, cols.discharge_date)
+        if dos in self._dates:
+            dos = self._dates[dos]
+        else:
+            self._dates[dos] = dos = Command._parse_date(dos)
+        return ClaimRecord(
+            cid,
+            _first(row, cols.patient_name),
+            Command._to_decimal(_first(row, cols.billed_amount)),
+            Command._to_decimal(_first(row, cols.paid_amount)),
+            status,
+            sys.intern(_first(row, cols.insurer)),
+            dos,
+        )
 
 
 class Command(BaseCommand):
+    # Cleared once a file commits the run-wide "all" resets.
+    _pending_resets = True
+    # claims.dimensions.InsurerIndex, built by the first file that writes.
+    _insurers = None
+
     help = (
         "Load/Upsert claims from CSV/JSON.\n"
         "Supports cleaning Notes and need_review before upsert."
     )
+    # Set by the job runner (claims.jobs): progress(done, total)
+    stealth_options = ("progress",)
+    # Cron runs this once per small file; system checks belong to deploy, not every import.
+    requires_system_checks = []
 
     def add_arguments(self, parser):
-        parser.add_argument("path", help="Path to CSV or JSON file.")
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("paths", nargs="+", metavar="path",
+                            help="CSV/JSON files (optionally .gz/.bz2/.xz/.zst or inside .zip), "
+                                 "directories or glob patterns (quote globs). "
+                                 "Files load in order, one transaction each.")
         parser.add_argument(
             "--format",
             choices=["auto", "csv", "json"],
@@ -38,7 +175,8 @@ class Command(BaseCommand):
             "--reset-notes",
             choices=["all", "file", "keep"],
             default="all",  # clean all notes
-            help="Reset notes before load (default: all). "
+            help="Reset notes before load (default: all, kept for existing scripts; "
+                 "ingest and queued imports default to keep). "
                  "Use 'file' to clear only notes of claims present in the file, "
                  "or 'keep' to keep existing notes."
         )
@@ -52,22 +190,30 @@ class Command(BaseCommand):
             action="store_true",
             help="Do not write to DB; show what would happen.",
         )
+        parser.add_argument(
+            "--id-cache-size",
+            type=int,
+            default=200_000,  # claims.ingest.DEFAULT_ID_CACHE, not imported here to keep --help cheap
+            help="Max claim_id -> pk entries kept across files (default: 200000).",
+        )
 
     # ---------- Helpers ----------
     @staticmethod
-    def _detect_format(path: Path, forced: str) -> str:
+    def _detect_format(src, forced: str) -> str:
+        from claims.ingest import open_text
+
         if forced != "auto":
             return forced
-        ext = path.suffix.lower()
+        ext = src.suffix  # compression suffixes stripped
         if ext in {".csv", ".tsv"}:
             return "csv"
         if ext in {".json", ".ndjson"}:
             return "json"
-        # fallback: try read first char
+        # fallback: sniff the first character of the decompressed text
         try:
-            with path.open("r", encoding="utf-8") as f:
-                head = f.read(1)
-            return "json" if head.strip().startswith("{") or head.strip().startswith("[") else "csv"
+            with open_text(src) as f:
+                head = f.read(256).lstrip()[:1]
+            return "json" if head in ("{", "[") else "csv"
         except Exception:
             return "csv"
 
@@ -114,180 +260,218 @@ class Command(BaseCommand):
 
     @staticmethod
     def _norm_status(value: str | None) -> str | None:
-        if not value:
-            return None
-        v = str(value).strip().lower().replace("-", " ").replace("_", " ")
-        if "deny" in v:
-            return "denied"
-        if "paid" in v or "pay" in v:
-            return "paid"
-        if "review" in v:
-            return "under_review"
-        # fallback keep original lower word (avoid raising)
-        return v.replace(" ", "_")
-
-    @staticmethod
-    def _coerce_claim_id(row: dict) -> str | None:
-        for key in ("claim_id", "id", "Claim ID", "claimId"):
-            if key in row and str(row[key]).strip():
-                return str(row[key]).strip()
-        return None
-
-    @staticmethod
-    def _get_str(row: dict, *keys, default: str = "") -> str:
-        for k in keys:
-            if k in row and row[k] is not None:
-                s = str(row[k]).strip()
-                if s != "":
-                    return s
-        return default
-
-    def _load_rows_csv(self, path: Path, delimiter: str) -> list[dict]:
-        rows: list[dict] = []
-        with path.open("r", encoding="utf-8") as f:
-            reader = csv.DictReader(f, delimiter=delimiter)
-            for r in reader:
-                rows.append({(k or "").strip(): v for k, v in (r or {}).items()})
-        return rows
-
-    def _load_rows_json(self, path: Path) -> list[dict]:
-        txt = path.read_text(encoding="utf-8").strip()
-        if not txt:
-            return []
-        # array
-        if txt.startswith("["):
-            data = json.loads(txt)
-            if not isinstance(data, list):
-                raise CommandError("JSON root must be list when using array form.")
-            return [dict(x) for x in data]
-        # ndjson
-        rows = []
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
+        # Claim.Status code; None (keep the stored status) when unrecognized.
+        return normalize_status(value)
+
+    def _records_csv(self, src, delimiter: str, parser: RowParser) -> tuple[int, list[ClaimRecord]]:
+        from claims.ingest import open_text
+
+        records: list[ClaimRecord] = []
+        n = 0
+        with open_text(src) as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            header = next(reader, None)
+            if header is None:
+                return 0, records
+            cols = ColumnMap(header)
+            for row in reader:
+                if not row:
+                    continue  # blank line
+                n += 1
+                rec = parser.record(cols, row)
+                if rec is not None:
+                    records.append(rec)
+        return n, records
+
+    def _load_rows_json(self, src) -> list[dict]:
+        import json
+
+        from claims.ingest import open_text
+
+        with open_text(src) as f:
+            head = ""
+            while not head:
+                chunk = f.read(4096)
+                if not chunk:
+                    return []
+                head = chunk.lstrip()
+            # array: needs the whole document anyway
+            if head.startswith("["):
+                data = json.loads(head + f.read())
+                if not isinstance(data, list):
+                    raise CommandError("JSON root must be list when using array form.")
+                return [dict(x) for x in data]
+            # ndjson, streamed line by line (finish the sniffed chunk's last line first)
+            rows = []
+            for line in chain(io.StringIO(head + f.readline()), f):
                 s = line.strip()
                 if not s:
                     continue
                 rows.append(json.loads(s))
-        return rows
+            return rows
 
-    def _load_rows(self, path: Path, fmt: str, delimiter: str) -> list[dict]:
+    def _load_records(self, src, fmt: str, delimiter: str) -> tuple[int, list[ClaimRecord], dict]:
+        """(input row count, records with a claim_id, {unrecognized status: rows})."""
+        parser = RowParser()
         if fmt == "csv":
-            return self._load_rows_csv(path, delimiter)
-        if fmt == "json":
-            return self._load_rows_json(path)
-        raise CommandError(f"Unsupported format: {fmt}")
-
-    def _row_to_defaults(self, row: dict) -> dict:
-        patient_name = self._get_str(row, "patient_name", "patient", "Patient")
-        billed_amount = self._to_decimal(self._get_str(row, "billed_amount", "billed"))
-        paid_amount = self._to_decimal(self._get_str(row, "paid_amount", "paid"))
-        status = self._norm_status(self._get_str(row, "status"))
-        insurer = self._get_str(row, "insurer", "insurer_name", "payer", default="")
-        discharge_date = self._parse_date(self._get_str(row, "discharge_date", "date_of_service", "dos"))
+            n, records = self._records_csv(src, delimiter, parser)
+        elif fmt == "json":
+            rows = self._load_rows_json(src)
+            records = []
+            for r in rows:
+                rec = parser.record(parser.columns(tuple(r)), tuple(r.values()))
+                if rec is not None:
+                    records.append(rec)
+            n = len(rows)
+        else:
+            raise CommandError(f"Unsupported format: {fmt}")
+        return n, records, parser.unknown_status
 
-        defaults = {}
-        if patient_name:
-            defaults["patient_name"] = patient_name
-        if billed_amount is not None:
-            defaults["billed_amount"] = billed_amount
-        if paid_amount is not None:
-            defaults["paid_amount"] = paid_amount
-        if status:
-            defaults["status"] = status
-        # 只有提供时才覆盖；否则保留原值
-        defaults["insurer"] = insurer
-        defaults["discharge_date"] = discharge_date
-        return defaults
-
-    # ---------- Main ----------
-    def handle(self, *args, **opts):
-        path = Path(opts["path"]).expanduser().resolve()
-        if not path.exists():
-            raise CommandError(f"File not found: {path}")
-
-        fmt = self._detect_format(path, opts["format"])
-        delimiter = opts["delimiter"]
-        dry_run = bool(opts["dry_run"])
-        reset_notes = opts.get("reset_notes")
-        reset_needreview = opts.get("reset_needreview")
-
-        rows = self._load_rows(path, fmt, delimiter)
-        if not rows:
-            self.stdout.write(self.style.WARNING("No rows found."))
+    @staticmethod
+    def _existing_snapshots(file_ids, chunk: int = 500) -> dict[str, dict]:
+        from claims.audit import TRACKED_FIELDS
+
+        ids = list(file_ids)
+        snaps: dict[str, dict] = {}
+        for i in range(0, len(ids), chunk):
+            for v in (Claim.objects.filter(claim_id__in=ids[i:i + chunk])
+                      .values("claim_id", *TRACKED_FIELDS)):
+                snaps[v.pop("claim_id")] = v
+        return snaps
+
+    # ---------- Per file ----------
+    def read_file(self, src, opts) -> tuple[int, list[ClaimRecord], dict]:
+        """
+        Parse one Source (decompressing on the fly) into (row count,
+        records, unrecognized statuses). Runs on the ingest reader thread
+        while the previous file is written: no DB access.
+        """
+        return self._load_records(src, self._detect_format(src, opts["format"]), opts["delimiter"])
+
+    def load_file(self, report, parsed, opts, idmap, progress=None):
+        """Upsert one parsed file in its own transaction, filling `report`."""
+        n_rows, records, unknown_status = parsed
+        if not n_rows:
+            report.error = "no rows found"
             return
-
-        # Get Claim id
-        file_ids: list[str] = []
-        normalized_rows: list[tuple[str, dict]] = []
-        for r in rows:
-            cid = self._coerce_claim_id(r)
-            if not cid:
-                continue
-            file_ids.append(cid)
-            normalized_rows.append((cid, r))
-
-        if not normalized_rows:
-            self.stdout.write(self.style.WARNING("No valid claim_id in file."))
+        if not records:
+            report.error = "no valid claim_id in file"
             return
+        report.rows = len(records)
+        for raw, n in unknown_status.items():
+            self.stdout.write(self.style.WARNING(
+                f"{report.path}: unrecognized status {raw!r} on {n} rows; their status is left unchanged"))
+        file_id_set = {rec.claim_id for rec in records}
+        reset_notes = opts.get("reset_notes")
+        reset_needreview = opts.get("reset_needreview")
 
-        file_id_set = set(file_ids)
-
-
-        will_create = 0
-        will_update = 0
-        skipped = 0
-
-        # dry run
-        if dry_run:
-            existing = set(
-                Claim.objects.filter(claim_id__in=file_id_set)
-                .values_list("claim_id", flat=True)
-            )
-            for cid, _ in normalized_rows:
-                if cid in existing:
-                    will_update += 1
+        if opts["dry_run"]:
+            existing = idmap.resolve(file_id_set)
+            for rec in records:
+                if rec.claim_id in existing:
+                    report.updated += 1
                 else:
-                    will_create += 1
-            self.stdout.write(self.style.NOTICE(f"[Dry-run] Rows: {len(normalized_rows)}"))
-            self.stdout.write(self.style.NOTICE(f"[Dry-run] Create: {will_create}, Update: {will_update}"))
-
-            if reset_notes:
-                self.stdout.write(self.style.NOTICE(f"[Dry-run] Would reset notes: {reset_notes}"))
-            if reset_needreview:
-                self.stdout.write(self.style.NOTICE(f"[Dry-run] Would reset need_review: {reset_needreview}"))
+                    report.created += 1
             return
 
+        # Imported here, not at module level, to keep --help and argument errors cheap.
+        from claims.audit import TRACKED_FIELDS, AuditLog
+        from claims.dimensions import InsurerIndex
+        from claims.queues import QueueDelta
+        from claims.rollups import RollupDelta, snapshot
+
+        if self._insurers is None:
+            self._insurers = InsurerIndex()
+        rollup = RollupDelta()
+        queue = QueueDelta()
+        audit = AuditLog("load_claims")
+        try:
+            with transaction.atomic(using=tenants.db()):
+                # One lookup (or insert) per distinct insurer name in the file.
+                insurer_ids = {raw: self._insurers.resolve(raw) for raw in {rec.insurer for rec in records}}
+                state = self._existing_snapshots(file_id_set)
+                for cid, snap in state.items():
+                    idmap.put(cid, snap["id"])
+
+                # "all" resets run once per command, inside the first file that commits.
+                if reset_notes == "all" and self._pending_resets:
+                    Note.objects.all().delete()
+                elif reset_notes == "file":
+                    Note.objects.filter(claim__claim_id__in=file_id_set).delete()
+
+                if reset_needreview == "all" and self._pending_resets:
+                    for pk in Claim.objects.filter(need_review=True).values_list("pk", flat=True).iterator():
+                        audit.record(pk, {"need_review": True}, {"need_review": False})
+                    Claim.objects.update(need_review=False)
+                    ClaimRollup.objects.update(need_review_count=0)
+                    for snap in state.values():
+                        snap["need_review"] = False
+                elif reset_needreview == "file":
+                    Claim.objects.filter(claim_id__in=file_id_set).update(need_review=False)
+                    for snap in state.values():
+                        if snap["need_review"]:
+                            rollup.change(snap, dict(snap, need_review=False))
+                            audit.record(snap["id"], snap, dict(snap, need_review=False))
+                            snap["need_review"] = False
+
+                # Upsert
+                total = len(records)
+                for i, rec in enumerate(records, 1):
+                    if progress and i % 500 == 0:
+                        progress(i, total)
+                    cid = rec.claim_id
+                    obj, created = Claim.objects.update_or_create(
+                        claim_id=cid,
+                        defaults=rec.defaults(insurer_ids),
+                    )
+                    if created:
+                        report.created += 1
+                    else:
+                        report.updated += 1
+                    idmap.put(cid, obj.pk)
+                    after = snapshot(obj, TRACKED_FIELDS)
+                    rollup.change(state.get(cid), after)
+                    queue.change(obj.pk, state.get(cid), after)
+                    audit.record(obj.pk, state.get(cid), after)
+                    state[cid] = after
+
+                rollup.apply()
+                queue.apply()
+                audit.flush()
+                if progress:
+                    progress(total, total)
+        except Exception:
+            idmap.forget(file_id_set)
+            self._insurers = None  # may hold insurers created in the rolled-back transaction
+            raise
+        self._pending_resets = False
 
-        with transaction.atomic():
-
-            if reset_notes == "all":
-                Note.objects.all().delete()
-            elif reset_notes == "file":
-                Note.objects.filter(claim__claim_id__in=file_id_set).delete()
-
-            if reset_needreview == "all":
-                Claim.objects.update(need_review=False)
-            elif reset_needreview == "file":
-                Claim.objects.filter(claim_id__in=file_id_set).update(need_review=False)
+    def steps(self, paths, opts, idmap) -> list[tuple]:
+        """(path, kind, read, load) for claims.ingest.run_files."""
+        return [(p, "claims", lambda p: self.read_file(p, opts),
+                 lambda report, parsed, progress: self.load_file(report, parsed, opts, idmap, progress))
+                for p in paths]
 
-            # Upsert
-            for cid, row in normalized_rows:
-                defaults = self._row_to_defaults(row)
-                if not defaults:
-                    skipped += 1
-                    continue
-                obj, created = Claim.objects.update_or_create(
-                    claim_id=cid,
-                    defaults=defaults,
-                )
-                if created:
-                    will_create += 1
-                else:
-                    will_update += 1
-
-        self.stdout.write(self.style.SUCCESS(f"Import done. Rows: {len(normalized_rows)}"))
-        self.stdout.write(self.style.SUCCESS(f"Created: {will_create}, Updated: {will_update}, Skipped: {skipped}"))
-        if reset_notes:
-            self.stdout.write(self.style.SUCCESS(f"Notes reset: {reset_notes}"))
-        if reset_needreview:
-            self.stdout.write(self.style.SUCCESS(f"need_review reset: {reset_needreview}"))
+    # ---------- Main ----------
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        from claims.ingest import DEFAULT_ID_CACHE, ClaimIdMap, expand_paths, run_files
+
+        idmap = ClaimIdMap(opts["id_cache_size"] or DEFAULT_ID_CACHE)
+        reports = run_files(self, self.steps(expand_paths(opts["paths"], CLAIM_SUFFIXES), opts, idmap),
+                            opts.get("progress"))
+
+        ok = [r for r in reports if not r.error]
+        prefix = "[Dry-run] " if opts["dry_run"] else ""
+        style = self.style.NOTICE if opts["dry_run"] else self.style.SUCCESS
+        self.stdout.write(style(f"{prefix}Import done. Files: {len(ok)}/{len(reports)}, "
+                                f"Rows: {sum(r.rows for r in ok)}"))
+        self.stdout.write(style(f"{prefix}Created: {sum(r.created for r in ok)}, "
+                                f"Updated: {sum(r.updated for r in ok)}, Skipped: {sum(r.skipped for r in ok)}"))
+        if opts.get("reset_notes"):
+            self.stdout.write(style(f"{prefix}Notes reset: {opts['reset_notes']}"))
+        if opts.get("reset_needreview"):
+            self.stdout.write(style(f"{prefix}need_review reset: {opts['reset_needreview']}"))
+        failed = len(reports) - len(ok)
+        if failed:
+            raise CommandError(f"{failed} of {len(reports)} files failed.")
@@ -1,8 +1,14 @@
 # claims/management/commands/load_details.py
-import csv, re
+import csv, re, sys
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from claims import tenants
 from claims.models import Claim
 
+# What a directory argument picks up.
+DETAIL_SUFFIXES = (".csv", ".tsv", ".txt")  # also compressed / in zips
+CPT_KEYS = ("cpt_codes", "cpt", "cpts", "cpt code", "cpt codes", "codes")
+
 def parse_cpts(raw):
     if raw is None:
         return []
@@ -15,60 +21,154 @@ def parse_cpts(raw):
     return [p for p in parts if p]
 
 class Command(BaseCommand):
-    help = "Merge detail info (CPT, denial_reason, etc.) into existing claims by claim_id."
+    help = ("Merge detail info (CPT, denial_reason, etc.) into existing claims by claim_id. "
+            "Accepts several files, directories and glob patterns; one transaction per file.")
+    # Set by the job runner (claims.jobs): progress(done, total)
+    stealth_options = ("progress",)
+    # Cron runs this once per small file; system checks belong to deploy, not every import.
+    requires_system_checks = []
+
+    batch_size = 500
 
     def add_arguments(self, parser):
-        parser.add_argument("path", help="CSV/TSV path")
+        tenants.add_tenant_argument(parser)
+        parser.add_argument("paths", nargs="+", metavar="path",
+                            help="CSV/TSV files (optionally .gz/.bz2/.xz/.zst or inside .zip), "
+                                 "directories or glob patterns (quote globs)")
         parser.add_argument("--delimiter", default=",", help="CSV delimiter, e.g. ',' or '|'")
         parser.add_argument("--dry-run", action="store_true",
                             help="Preview changes without writing DB")
+        parser.add_argument("--id-cache-size", type=int, default=200_000,  # claims.ingest.DEFAULT_ID_CACHE
+                            help="Max claim_id -> pk entries kept across files (default: 200000)")
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        from claims.ingest import DEFAULT_ID_CACHE, ClaimIdMap, expand_paths, run_files
+
+        idmap = ClaimIdMap(opts["id_cache_size"] or DEFAULT_ID_CACHE)
+        paths = expand_paths(opts["paths"], DETAIL_SUFFIXES)
+        reports = run_files(self, self.steps(paths, opts, idmap), opts.get("progress"))
+
+        ok = [r for r in reports if not r.error]
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. files={len(ok)}/{len(reports)}, updated={sum(r.updated for r in ok)}, "
+            f"missing={sum(r.missing for r in ok)}, dry_run={opts['dry_run']}"
+        ))
+        if len(ok) < len(reports):
+            raise CommandError(f"{len(reports) - len(ok)} of {len(reports)} files failed.")
+
+    def steps(self, paths, opts, idmap) -> list[tuple]:
+        """(path, kind, read, load) for claims.ingest.run_files."""
+        return [(p, "details", lambda p: self.read_file(p, opts["delimiter"]),
+                 lambda report, rows, progress: self.load_file(report, rows, opts, idmap, progress))
+                for p in paths]
+
+    @staticmethod
+    def read_file(src, delimiter) -> list[tuple[str, str, str]]:
+        """
+        Parse one Source, decompressing on the fly, into (claim_id,
+        denial_reason, cpt_raw) tuples; the header is resolved to column
+        indexes once and repeated reasons share one interned string. Runs on
+        the ingest reader thread, so no DB access.
+        """
+        from claims.ingest import open_text
 
-    def handle(self, path, delimiter, dry_run, *args, **kwargs):
         try:
-            f = open(path, newline="", encoding="utf-8")
-        except OSError as e:
-            raise CommandError(f"Cannot open file: {e}")
+            with open_text(src) as f:
+                reader = csv.reader(f, delimiter=delimiter)
+                header = next(reader, None) or []
+                pos = {h: i for i, h in enumerate(header)}
+                if "claim_id" not in pos:
+                    raise CommandError("Missing 'claim_id' column in file.")
+                id_col = pos["claim_id"]
+                reason_col = pos.get("denial_reason", -1)
+                cpt_cols = [pos[k] for k in CPT_KEYS if k in pos]
+                rows = []
+                for row in reader:
+                    if not row:
+                        continue  # blank line
+                    n = len(row)
+                    reason = row[reason_col].strip() if 0 <= reason_col < n else ""
+                    cpt_raw = next((row[i] for i in cpt_cols if i < n and row[i]), None)
+                    rows.append((row[id_col].strip() if id_col < n else "",
+                                 sys.intern(reason) if reason else "", cpt_raw))
+                return rows
+        except OSError as e:  # includes corrupt gzip/bz2/xz streams
+            raise CommandError(f"Cannot read file: {e}")
 
-        reader = csv.DictReader(f, delimiter=delimiter)
-        if "claim_id" not in reader.fieldnames:
-            raise CommandError("Missing 'claim_id' column in file.")
+    def load_file(self, report, rows, opts, idmap, progress=None):
+        """Merge one parsed file in its own transaction, filling `report`."""
+        # Imported here, not at module level, to keep --help and argument errors cheap.
+        from claims.audit import AuditLog
+        from claims.denials import DenialReasonIndex
+        from claims.rollups import RollupDelta
+
+        dry_run = opts["dry_run"]
+        if getattr(self, "_denials", None) is None:
+            self._denials = DenialReasonIndex()
+        rollup = RollupDelta()
+        audit = AuditLog("load_details")
+        report.rows = len(rows)
+        try:
+            with transaction.atomic(using=tenants.db()):
+                report.updated, report.missing = self._merge_rows(
+                    rows, idmap, self._denials, rollup, audit, dry_run, progress)
+                if not dry_run:
+                    rollup.apply()
+                    audit.flush()
+        except Exception:
+            self._denials = None  # may hold reasons created in the rolled-back transaction
+            raise
+
+    def _merge_rows(self, rows, idmap, denials, rollup, audit, dry_run, progress=None):
+        """
+        Claims are fetched a batch at a time: ids resolve through the shared
+        ClaimIdMap (free after load_claims in the same run), then one in_bulk
+        by pk per batch instead of a get() per row.
+        """
+        from claims.audit import TRACKED_FIELDS
+        from claims.rollups import snapshot
 
         updated = 0
         missing = 0
-        for row in reader:
-            claim_id = (row.get("claim_id") or "").strip()
-            if not claim_id:
-                continue
-
-            try:
-                claim = Claim.objects.get(claim_id=claim_id)
-            except Claim.DoesNotExist:
-                missing += 1
-                self.stdout.write(self.style.WARNING(f"Skip claim_id={claim_id}: not found"))
-                continue
-
-            info = dict(claim.detail_info or {})
-
-            if "denial_reason" in row and row["denial_reason"]:
-                info["denial_reason"] = row["denial_reason"].strip()
-
-            # 解析 CPT
-            cpt_raw = None
-            for key in ("cpt_codes", "cpt", "cpts", "cpt code", "cpt codes", "codes"):
-                if key in row and row[key]:
-                    cpt_raw = row[key]
-                    break
-            cpts = parse_cpts(cpt_raw)
-            if cpts:
-                info["cpt_codes"] = cpts
-
-            if info != (claim.detail_info or {}):
-                self.stdout.write(f"claim_id={claim_id} detail_info -> {info}")
-                if not dry_run:
-                    claim.detail_info = info
-                    claim.save(update_fields=["detail_info"])
-                updated += 1
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            if progress and start:
+                progress(start)
+            pks = idmap.resolve(row[0] for row in batch if row[0])
+            claims = Claim.objects.in_bulk(set(pks.values()))
 
-        self.stdout.write(self.style.SUCCESS(
-            f"Done. updated={updated}, missing={missing}, dry_run={dry_run}"
-        ))
+            for claim_id, reason, cpt_raw in batch:
+                if not claim_id:
+                    continue
+                claim = claims.get(pks.get(claim_id))
+                if claim is None:
+                    missing += 1
+                    self.stdout.write(self.style.WARNING(f"Skip claim_id={claim_id}: not found"))
+                    continue
+
+                info = dict(claim.detail_info or {})
+                denial_id = claim.denial_id
+
+                if reason:
+                    info["denial_reason"] = reason
+                    denial_id = denials.resolve(reason, create=not dry_run)
+
+                # 解析 CPT
+                cpts = parse_cpts(cpt_raw)
+                if cpts:
+                    info["cpt_codes"] = cpts
+
+                if info != (claim.detail_info or {}) or denial_id != claim.denial_id:
+                    self.stdout.write(f"claim_id={claim_id} detail_info -> {info}")
+                    if not dry_run:
+                        before = snapshot(claim, TRACKED_FIELDS)
+                        claim.detail_info = info
+                        claim.denial_id = denial_id
+                        claim.save(update_fields=["detail_info", "denial"])
+                        after = snapshot(claim, TRACKED_FIELDS)
+                        rollup.change(before, after)
+                        audit.record(claim.pk, before, after)
+                    updated += 1
+
+        return updated, missing
@@ -0,0 +1,20 @@
+# claims/management/commands/rebuild_rollups.py
+from django.core.management.base import BaseCommand
+
+from claims import tenants
+from claims.rollups import rebuild_denial_rollups, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the claim and denial-reason rollups from scratch."
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        groups = rebuild_rollups()
+        denial_groups = rebuild_denial_rollups()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups rebuilt. groups={groups}, denial_groups={denial_groups}"
+        ))
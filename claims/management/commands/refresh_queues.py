@@ -0,0 +1,22 @@
+# claims/management/commands/refresh_queues.py
+from django.core.management.base import BaseCommand
+
+from claims import tenants
+from claims.models import SavedSearch
+from claims.queues import materialize
+
+
+class Command(BaseCommand):
+    help = ("Rebuild every materialized work queue from scratch. Loads and flagging keep them "
+            "current; run this after insurer alias edits or manual DB changes.")
+
+    def add_arguments(self, parser):
+        tenants.add_tenant_argument(parser)
+
+    @tenants.tenant_command
+    def handle(self, *args, **opts):
+        searches = list(SavedSearch.objects.filter(materialized=True))
+        for search in searches:
+            n = materialize(search)
+            self.stdout.write(f"{search.name} ({search.owner}): {n} claims")
+        self.stdout.write(self.style.SUCCESS(f"Queues rebuilt. queues={len(searches)}"))
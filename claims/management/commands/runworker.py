@@ -0,0 +1,84 @@
+# claims/management/commands/runworker.py
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+
+from claims import jobs
+from claims.models import Job
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (imports, rollup rebuilds, duplicate checks) in a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=min(4, os.cpu_count() or 1),
+                            help="Pool size (default: min(4, CPUs)).")
+        parser.add_argument("--poll", type=float, default=1.0,
+                            help="Seconds between queue polls (default: 1.0).")
+        parser.add_argument("--lease", type=int, default=300,
+                            help="Seconds without heartbeat before a running job is recovered (default: 300).")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once the queue is empty and nothing is running.")
+
+    def handle(self, *args, **opts):
+        worker = jobs.worker_name()
+        concurrency = max(1, opts["concurrency"])
+        jobs.preload_job_modules()
+        self.stdout.write(f"Worker {worker} started, concurrency={concurrency}")
+
+        while True:
+            # Children must not inherit the parent's open DB connections.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency, initializer=jobs.init_worker_process)
+            try:
+                if self._serve(pool, worker, concurrency, opts) == "exit":
+                    return
+            except KeyboardInterrupt:
+                self.stdout.write("Interrupted; requeueing running jobs.")
+                for job_id in Job.objects.filter(status="running", worker=worker).values_list("pk", flat=True):
+                    jobs.release(job_id, "Worker stopped; ", expected_worker=worker)
+                return
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def _serve(self, pool, worker, concurrency, opts):
+        running = {}  # future -> job pk
+        unfinished = {}  # job pk -> (outcome, message) waiting for the DB write lock
+        while True:
+            try:
+                jobs.recover_stale(opts["lease"])
+                for job_id, result in list(unfinished.items()):
+                    jobs.finish(job_id, *result)
+                    del unfinished[job_id]
+                while len(running) < concurrency:
+                    job = jobs.claim_next(worker)
+                    if job is None:
+                        break
+                    self.stdout.write(f"-> job {job.pk} {job.kind} (attempt {job.attempts})")
+                    running[pool.submit(jobs.run_job, job.pk)] = job.pk
+            except OperationalError:
+                pass  # another process holds the SQLite write lock; retry next tick
+
+            if not running:
+                if opts["once"] and not unfinished and not Job.objects.filter(status="queued").exists():
+                    return "exit"
+                time.sleep(opts["poll"])
+                continue
+
+            done, _ = wait(running, timeout=opts["poll"], return_when=FIRST_COMPLETED)
+            for fut in done:
+                job_id = running.pop(fut)
+                try:
+                    outcome, message = fut.result()
+                except BrokenProcessPool:
+                    # A child died (OOM, kill -9...). Requeue everything this pool owned.
+                    for other in [job_id, *running.values()]:
+                        jobs.release(other, "Worker process crashed; ", expected_worker=worker)
+                    return "restart"
+                self.stdout.write(f"<- job {job_id} {outcome}")
+                unfinished[job_id] = (outcome, message)
+            jobs.heartbeat(running.values())
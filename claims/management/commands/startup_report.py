@@ -0,0 +1,98 @@
+# claims/management/commands/startup_report.py
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def parse_importtime(stderr: str):
+    """Yield (module, self_us, cumulative_us, depth) from `python -X importtime` output."""
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # column header
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        yield name.strip(), int(self_us), int(cum_us), depth
+
+
+def package_of(module: str) -> str:
+    parts = module.split(".")
+    if parts[0] == "django" and len(parts) > 2 and parts[1] == "contrib":
+        return ".".join(parts[:3])
+    return ".".join(parts[:2]) if parts[0] in ("django", "claims") else parts[0]
+
+
+class Command(BaseCommand):
+    help = ("Measure cold start of a manage.py command in fresh interpreters and break import time "
+            "down by package (python -X importtime). Uses the current settings module; pass "
+            "--settings claims_demo.settings_ingest to measure the ingest profile. With --budget-ms, "
+            "exits non-zero when the median wall time is over budget (for CI).")
+
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", default="load_claims --help",
+                            help='manage.py command line to measure (default: "load_claims --help").')
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15)
+        parser.add_argument("--budget-ms", type=float, default=0,
+                            help="Fail when the median cold start exceeds this many milliseconds.")
+
+    def _argv(self, target, importtime=False):
+        manage = Path(settings.BASE_DIR) / "manage.py"
+        return [sys.executable, *(["-X", "importtime"] if importtime else []), str(manage), *target]
+
+    def handle(self, *args, **opts):
+        target = shlex.split(opts["target"])
+        env = dict(os.environ)
+        self.stdout.write(f"settings={env.get('DJANGO_SETTINGS_MODULE')}  target={' '.join(target)}")
+
+        walls = []
+        for _ in range(max(opts["runs"], 1)):
+            t0 = time.perf_counter()
+            proc = subprocess.run(self._argv(target), env=env, capture_output=True, text=True)
+            walls.append((time.perf_counter() - t0) * 1000)
+            if proc.returncode != 0:
+                raise CommandError(f"Target failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+        median = statistics.median(walls)
+        bare = []
+        for _ in range(3):
+            t0 = time.perf_counter()
+            subprocess.run([sys.executable, "-c", "pass"], env=env, capture_output=True)
+            bare.append((time.perf_counter() - t0) * 1000)
+        interpreter = statistics.median(bare)
+
+        proc = subprocess.run(self._argv(target, importtime=True), env=env, capture_output=True, text=True)
+        rows = list(parse_importtime(proc.stderr))
+        total_imports = sum(cum for _, _, cum, depth in rows if depth == 0) / 1000
+        by_package = defaultdict(int)
+        for module, self_us, _, _ in rows:
+            by_package[package_of(module)] += self_us
+
+        self.stdout.write(f"wall: median {median:.0f} ms over {len(walls)} runs "
+                          f"(min {min(walls):.0f}, max {max(walls):.0f}; bare interpreter ~{interpreter:.0f} ms)")
+        self.stdout.write(f"imports: {len(rows)} modules, {total_imports:.0f} ms (under -X importtime)")
+
+        self.stdout.write("\nself time by package:")
+        for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:opts["top"]]:
+            self.stdout.write(f"  {us / 1000:8.1f} ms  {pkg}")
+
+        self.stdout.write("\nslowest top-level imports (cumulative):")
+        top = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:opts["top"]]
+        for module, _, cum, _ in top:
+            self.stdout.write(f"  {cum / 1000:8.1f} ms  {module}")
+
+        budget = opts["budget_ms"]
+        if budget:
+            if median > budget:
+                raise CommandError(f"Cold start {median:.0f} ms is over the {budget:.0f} ms budget.")
+            self.stdout.write(self.style.SUCCESS(f"\nWithin budget: {median:.0f} ms <= {budget:.0f} ms"))
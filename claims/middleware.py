@@ -0,0 +1,147 @@
+# claims/middleware.py
+"""
+Response compression.
+
+CompressionMiddleware is Django's GZipMiddleware plus:
+- brotli when the optional `brotli` package is installed and the client
+  prefers it (Accept-Encoding q-values are honoured),
+- a size threshold (settings.COMPRESS_MIN_SIZE) so tiny HTMX fragments such
+  as a flag button are sent as-is,
+- no compression of server-sent events, which must reach the client one
+  event at a time.
+
+HTML is never sent as brotli: it carries CSRF tokens, and only the gzip path
+has Django's Heal-The-BREACH mitigation (a random-length filename field in the
+gzip header, GZipMiddleware.max_random_bytes); brotli has nowhere to put it.
+
+Streaming responses (exports) are compressed incrementally with one
+compressor per response, sync or async, so memory stays flat however large
+the body is.
+"""
+from __future__ import annotations
+
+import secrets
+from gzip import GzipFile
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import StreamingBuffer
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+DEFAULT_MIN_SIZE = 1024
+BROTLI_QUALITY = 5  # dynamic responses: fast, still ~15% smaller than gzip -6
+
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+NO_BROTLI_TYPES = ("text/html",)  # see the module docstring (BREACH)
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}, dropping codings with q=0."""
+    result = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            result[coding] = q
+    return result
+
+
+def choose_encoding(header: str, allow_brotli: bool = True) -> str | None:
+    """"br", "gzip" or None, preferring brotli on a tie."""
+    accepted = accepted_encodings(header)
+    candidates = ["br", "gzip"] if brotli is not None and allow_brotli else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _brotli_stream(chunks):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _brotli_astream(chunks):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    async for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def _gzip_astream(chunks, max_random_bytes):
+    """Async twin of django.utils.text.compress_sequence: one gzip member for the whole stream."""
+    buf = StreamingBuffer()
+    # Random-length filename: the same Heal-The-BREACH padding as compress_sequence.
+    filename = b"a" * secrets.randbelow(max_random_bytes) if max_random_bytes else None
+    with GzipFile(filename=filename, mode="wb", compresslevel=6, fileobj=buf, mtime=0) as zfile:
+        yield buf.read()
+        async for chunk in chunks:
+            zfile.write(chunk)
+            data = buf.read()
+            if data:
+                yield data
+    yield buf.read()
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        if content_type.startswith(UNCOMPRESSED_TYPES):
+            return response
+        min_size = getattr(settings, "COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""),
+                                   allow_brotli=not content_type.startswith(NO_BROTLI_TYPES))
+        if encoding == "gzip" and not (response.streaming and response.is_async):
+            return super().process_response(request, response)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if encoding is None:
+            return response
+
+        if encoding == "gzip":  # async streaming; GZipMiddleware would gzip each chunk on its own
+            response.streaming_content = _gzip_astream(response.streaming_content, self.max_random_bytes)
+            del response.headers["Content-Length"]
+        elif response.streaming:
+            if response.is_async:
+                response.streaming_content = _brotli_astream(response.streaming_content)
+            else:
+                response.streaming_content = _brotli_stream(response.streaming_content)
+            del response.headers["Content-Length"]
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
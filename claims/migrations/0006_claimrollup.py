@@ -0,0 +1,68 @@
+# Generated by Django 4.2.23 on 2026-10-19 02:47
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+ZERO = Decimal("0.00")
+
+
+def backfill(apps, schema_editor):
+    # Same groups as rollups.rebuild_rollups(), so later deltas build on the
+    # claims already loaded instead of on zero.
+    db = schema_editor.connection.alias
+    Claim = apps.get_model("claims", "Claim")
+    ClaimRollup = apps.get_model("claims", "ClaimRollup")
+    groups = defaultdict(lambda: [0, 0, ZERO, ZERO, ZERO])
+    rows = Claim.objects.using(db).values_list(
+        "insurer", "status", "discharge_date", "billed_amount", "paid_amount", "need_review")
+    for insurer, status, day, billed, paid, need_review in rows.iterator(chunk_size=5000):
+        billed, paid = billed or ZERO, paid or ZERO
+        g = groups[(insurer or "", status or "", f"{day.year:04d}-{day.month:02d}" if day else "")]
+        g[0] += 1
+        g[1] += 1 if need_review else 0
+        g[2] += billed
+        g[3] += paid
+        g[4] += max(billed - paid, ZERO)
+    ClaimRollup.objects.using(db).bulk_create([
+        ClaimRollup(insurer=k[0], status=k[1], discharge_month=k[2], claim_count=g[0], need_review_count=g[1],
+                    billed_total=g[2], paid_total=g[3], underpaid_total=g[4])
+        for k, g in groups.items()
+    ], batch_size=1000)
+
+
+def clear(apps, schema_editor):
+    apps.get_model("claims", "ClaimRollup").objects.using(schema_editor.connection.alias).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0005_claim_need_review'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('insurer', models.CharField(blank=True, max_length=128)),
+                ('status', models.CharField(max_length=20)),
+                ('discharge_month', models.CharField(blank=True, max_length=7)),
+                ('claim_count', models.IntegerField(default=0)),
+                ('need_review_count', models.IntegerField(default=0)),
+                ('billed_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('paid_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('underpaid_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'ordering': ['insurer', 'status', 'discharge_month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='claimrollup',
+            constraint=models.UniqueConstraint(fields=('insurer', 'status', 'discharge_month'), name='uniq_claim_rollup_group'),
+        ),
+        migrations.RunPython(backfill, clear),
+    ]
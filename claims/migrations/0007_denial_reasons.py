@@ -0,0 +1,53 @@
+# Generated by Django 4.2.23 on 2026-10-19 02:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0006_claimrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DenialReason',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=255, unique=True)),
+            ],
+            options={
+                'ordering': ['text'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DenialRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('insurer', models.CharField(blank=True, max_length=128)),
+                ('claim_count', models.IntegerField(default=0)),
+                ('billed_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('underpaid_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('reason', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='claims.denialreason')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DenialReasonAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('reason', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='claims.denialreason')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='claim',
+            name='denial',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claims', to='claims.denialreason'),
+        ),
+        migrations.AddConstraint(
+            model_name='denialrollup',
+            constraint=models.UniqueConstraint(fields=('reason', 'insurer'), name='uniq_denial_rollup_group'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0007_denial_reasons'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='claim',
+            index=models.Index(fields=['discharge_date'], name='claim_discharge_date_idx'),
+        ),
+    ]
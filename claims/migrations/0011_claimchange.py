@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 03:19
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0010_claimevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaimChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('claim_pk', models.BigIntegerField()),
+                ('month', models.CharField(max_length=7)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('op', models.CharField(choices=[('c', 'Created'), ('u', 'Updated'), ('m', 'Merged (compacted)')], default='u', max_length=1)),
+                ('source', models.CharField(blank=True, max_length=32)),
+                ('changes', models.JSONField(default=dict)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['claim_pk', 'changed_at'], name='claimchange_claim_time_idx'), models.Index(fields=['month', 'claim_pk'], name='claimchange_month_idx')],
+            },
+        ),
+    ]
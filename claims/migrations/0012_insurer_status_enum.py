@@ -0,0 +1,209 @@
+import re
+from collections import defaultdict
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+STATUS_VALUES = ("denied", "paid", "under_review")
+CLAIM_MEASURES = ("claim_count", "need_review_count", "billed_total", "paid_total", "underpaid_total")
+DENIAL_MEASURES = ("claim_count", "billed_total", "underpaid_total")
+
+# Frozen copies of claims.dimensions as of this migration, so later changes
+# to the live normalization rules do not change what it did.
+STATUS_ALIASES = {
+    "denied": "denied", "paid": "paid", "under_review": "under_review", "under review": "under_review",
+    "under-review": "under_review", "deny": "denied", "denial": "denied", "rejected": "denied",
+    "pay": "paid", "review": "under_review", "pending": "under_review", "in review": "under_review",
+    "pending review": "under_review",
+}
+KEY_SPLIT_RE = re.compile(r"[^a-z0-9]+")
+LEGAL_SUFFIXES = {"inc", "llc", "llp", "ltd", "corp", "corporation", "co", "company", "plc"}
+
+
+def normalize_status(value):
+    if not value:
+        return None
+    raw = str(value).strip().lower()
+    if raw in STATUS_ALIASES:
+        return STATUS_ALIASES[raw]
+    raw = raw.replace("-", " ").replace("_", " ")
+    if "deny" in raw or "denied" in raw or "denial" in raw:
+        return "denied"
+    if "paid" in raw or "pay" in raw:
+        return "paid"
+    if "review" in raw:
+        return "under_review"
+    return None
+
+
+def insurer_key(name):
+    toks = [t for t in KEY_SPLIT_RE.split((name or "").lower().replace("&", " and ")) if t]
+    while len(toks) > 1 and toks[-1] in LEGAL_SUFFIXES:
+        toks.pop()
+    return " ".join(toks)[:128]
+
+
+def _status(raw):
+    # Unrecognized legacy values fall back to the column default.
+    return normalize_status(raw) or "under_review"
+
+
+def forwards(apps, schema_editor):
+    db = schema_editor.connection.alias  # also run against tenant databases
+    Claim = apps.get_model("claims", "Claim")
+    ClaimRollup = apps.get_model("claims", "ClaimRollup")
+    DenialRollup = apps.get_model("claims", "DenialRollup")
+    ClaimChange = apps.get_model("claims", "ClaimChange")
+    Insurer = apps.get_model("claims", "Insurer")
+
+    # One Insurer per normalized name; the first spelling seen becomes its display name.
+    names = set(Claim.objects.using(db).values_list("insurer", flat=True).distinct())
+    names |= set(ClaimRollup.objects.using(db).values_list("insurer", flat=True).distinct())
+    names |= set(DenialRollup.objects.using(db).values_list("insurer", flat=True).distinct())
+    ids = {}
+    by_key = {}
+    for name in sorted(n for n in names if n):
+        key = insurer_key(name)
+        if key and key not in by_key:
+            by_key[key] = Insurer.objects.using(db).create(name=name.strip()[:128], key=key).pk
+        ids[name] = by_key.get(key)
+
+    for name, iid in ids.items():
+        Claim.objects.using(db).filter(insurer=name).update(insurer_ref=iid)
+    for raw in Claim.objects.using(db).exclude(status__in=STATUS_VALUES).values_list("status", flat=True).distinct():
+        Claim.objects.using(db).filter(status=raw).update(status=_status(raw))
+
+    # Rollup rows are re-keyed; groups that differed only by spelling merge.
+    merged = defaultdict(lambda: [0] * len(CLAIM_MEASURES))
+    for r in ClaimRollup.objects.using(db):
+        m = merged[(ids.get(r.insurer), _status(r.status), r.discharge_month)]
+        for i, f in enumerate(CLAIM_MEASURES):
+            m[i] += getattr(r, f)
+    ClaimRollup.objects.using(db).delete()
+    ClaimRollup.objects.using(db).bulk_create([
+        ClaimRollup(insurer="", insurer_ref_id=k[0], status=k[1], discharge_month=k[2], **dict(zip(CLAIM_MEASURES, m)))
+        for k, m in merged.items()
+    ], batch_size=1000)
+
+    merged = defaultdict(lambda: [0] * len(DENIAL_MEASURES))
+    for r in DenialRollup.objects.using(db):
+        m = merged[(r.reason_id, ids.get(r.insurer))]
+        for i, f in enumerate(DENIAL_MEASURES):
+            m[i] += getattr(r, f)
+    DenialRollup.objects.using(db).delete()
+    DenialRollup.objects.using(db).bulk_create([
+        DenialRollup(reason_id=k[0], insurer="", insurer_ref_id=k[1], **dict(zip(DENIAL_MEASURES, m)))
+        for k, m in merged.items()
+    ], batch_size=1000)
+
+    # History: insurer names become insurer_id values, statuses become codes.
+    batch = []
+    history = ClaimChange.objects.using(db).filter(models.Q(changes__has_key="insurer") |
+                                                   models.Q(changes__has_key="status"))
+    for ch in history.iterator(chunk_size=2000):
+        changes = dict(ch.changes)
+        if "insurer" in changes:
+            changes["insurer_id"] = [ids.get(v) if v else None for v in changes.pop("insurer")]
+        if "status" in changes:
+            changes["status"] = [_status(v) if v else v for v in changes["status"]]
+        ch.changes = {f: v for f, v in changes.items() if v[0] != v[1]}
+        batch.append(ch)
+        if len(batch) >= 2000:
+            ClaimChange.objects.using(db).bulk_update(batch, ["changes"])
+            batch = []
+    ClaimChange.objects.using(db).bulk_update(batch, ["changes"])
+
+
+def backwards(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Claim = apps.get_model("claims", "Claim")
+    ClaimRollup = apps.get_model("claims", "ClaimRollup")
+    DenialRollup = apps.get_model("claims", "DenialRollup")
+    Insurer = apps.get_model("claims", "Insurer")
+    for iid, name in Insurer.objects.using(db).values_list("id", "name"):
+        for model in (Claim, ClaimRollup, DenialRollup):
+            model.objects.using(db).filter(insurer_ref_id=iid).update(insurer=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0011_claimchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Insurer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128)),
+                ('key', models.CharField(max_length=128, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InsurerAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=128, unique=True)),
+                ('insurer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aliases', to='claims.insurer')),
+            ],
+            options={
+                'verbose_name_plural': 'insurer aliases',
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='claimrollup',
+            name='uniq_claim_rollup_group',
+        ),
+        migrations.RemoveConstraint(
+            model_name='denialrollup',
+            name='uniq_denial_rollup_group',
+        ),
+        migrations.AddField(
+            model_name='claim',
+            name='insurer_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='claims', to='claims.insurer'),
+        ),
+        migrations.AddField(
+            model_name='claimrollup',
+            name='insurer_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='claims.insurer'),
+        ),
+        migrations.AddField(
+            model_name='denialrollup',
+            name='insurer_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='claims.insurer'),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(model_name='claim', name='insurer'),
+        migrations.RemoveField(model_name='claimrollup', name='insurer'),
+        migrations.RemoveField(model_name='denialrollup', name='insurer'),
+        migrations.RenameField(model_name='claim', old_name='insurer_ref', new_name='insurer'),
+        migrations.RenameField(model_name='claimrollup', old_name='insurer_ref', new_name='insurer'),
+        migrations.RenameField(model_name='denialrollup', old_name='insurer_ref', new_name='insurer'),
+        migrations.AlterField(
+            model_name='claim',
+            name='status',
+            field=models.CharField(choices=[('denied', 'Denied'), ('paid', 'Paid'), ('under_review', 'Under Review')], default='under_review', max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='claimrollup',
+            name='status',
+            field=models.CharField(choices=[('denied', 'Denied'), ('paid', 'Paid'), ('under_review', 'Under Review')], max_length=12),
+        ),
+        migrations.AddConstraint(
+            model_name='claim',
+            constraint=models.CheckConstraint(check=models.Q(('status__in', ['denied', 'paid', 'under_review'])), name='claim_status_valid'),
+        ),
+        migrations.AddConstraint(
+            model_name='claimrollup',
+            constraint=models.UniqueConstraint(fields=('insurer', 'status', 'discharge_month'), name='uniq_claim_rollup_group'),
+        ),
+        migrations.AddConstraint(
+            model_name='denialrollup',
+            constraint=models.UniqueConstraint(fields=('reason', 'insurer'), name='uniq_denial_rollup_group'),
+        ),
+    ]
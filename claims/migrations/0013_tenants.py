@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 04:09
+
+import claims.tenants
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0012_insurer_status_enum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claim',
+            name='tenant',
+            field=models.CharField(blank=True, default=claims.tenants.current, editable=False, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='tenant',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='tenant',
+            field=models.CharField(blank=True, default=claims.tenants.current, editable=False, max_length=32),
+        ),
+    ]
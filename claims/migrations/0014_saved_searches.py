@@ -0,0 +1,59 @@
+# Generated by Django 4.2.23 on 2026-10-19 04:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('claims', '0013_tenants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=150)),
+                ('name', models.CharField(max_length=80)),
+                ('q', models.CharField(blank=True, max_length=200)),
+                ('status', models.CharField(blank=True, choices=[('denied', 'Denied'), ('paid', 'Paid'), ('under_review', 'Under Review')], max_length=12)),
+                ('date_order', models.CharField(choices=[('newest', 'Newest first'), ('oldest', 'Oldest first')], default='newest', max_length=6)),
+                ('use_count', models.PositiveIntegerField(default=0)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+                ('materialized', models.BooleanField(default=False)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name_plural': 'saved searches',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkQueueEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sort_key', models.CharField(max_length=40)),
+                ('claim', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='claims.claim')),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='entries', to='claims.savedsearch')),
+            ],
+            options={
+                'verbose_name_plural': 'work queue entries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='savedsearch',
+            constraint=models.UniqueConstraint(fields=('owner', 'name'), name='uniq_saved_search_name'),
+        ),
+        migrations.AddIndex(
+            model_name='workqueueentry',
+            index=models.Index(fields=['search', 'sort_key'], name='queue_order_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='workqueueentry',
+            constraint=models.UniqueConstraint(fields=('search', 'claim'), name='uniq_queue_claim'),
+        ),
+    ]
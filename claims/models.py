@@ -1,19 +1,84 @@
 from django.db import models
 from django.utils import timezone
 
+from .tenants import TenantManager, current as current_tenant
+
+
+class DenialReason(models.Model):
+    """Interned, canonical denial reason; near-duplicate texts map to one row."""
+    text = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True)  # sorted normalized tokens
+
+    class Meta:
+        ordering = ["text"]
+
+    def __str__(self):
+        return self.text
+
+
+class DenialReasonAlias(models.Model):
+    """Normalized raw text -> canonical DenialReason (exact-match fast path)."""
+    key = models.CharField(max_length=255, unique=True)
+    reason = models.ForeignKey(DenialReason, on_delete=models.CASCADE, related_name="aliases")
+
+    def __str__(self):
+        return f"{self.key} → {self.reason_id}"
+
+
+class Insurer(models.Model):
+    """Canonical payer; claims and rollups point here instead of repeating the name."""
+    name = models.CharField(max_length=128)
+    key = models.CharField(max_length=128, unique=True)  # normalized name, see claims/dimensions.py
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        from .dimensions import insurer_key
+
+        self.key = insurer_key(self.key or self.name)
+        super().save(*args, **kwargs)
+
+
+class InsurerAlias(models.Model):
+    """Other normalized spelling -> Insurer (e.g. "uhc" -> United Healthcare)."""
+    key = models.CharField(max_length=128, unique=True)
+    insurer = models.ForeignKey(Insurer, on_delete=models.CASCADE, related_name="aliases")
+
+    class Meta:
+        verbose_name_plural = "insurer aliases"
+
+    def __str__(self):
+        return f"{self.key} → {self.insurer_id}"
+
+    def save(self, *args, **kwargs):
+        from .dimensions import insurer_key
+
+        self.key = insurer_key(self.key)  # matched against insurer_key() of raw feed names
+        super().save(*args, **kwargs)
+
+
+class ClaimStatus(models.TextChoices):
+    DENIED = "denied", "Denied"
+    PAID = "paid", "Paid"
+    UNDER_REVIEW = "under_review", "Under Review"
+
+
 class Claim(models.Model):
-    STATUS_CHOICES = [
-        ("denied", "Denied"),
-        ("paid", "Paid"),
-        ("under_review", "Under Review"),
-    ]
+    Status = ClaimStatus
+    STATUS_CHOICES = ClaimStatus.choices
 
+    # Owning client (claims/tenants.py); constant within a tenant database.
+    tenant = models.CharField(max_length=32, blank=True, default=current_tenant, editable=False)
     claim_id = models.CharField(max_length=32, unique=True)
     patient_name = models.CharField(max_length=128)
     billed_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="under_review")
-    insurer = models.CharField(max_length=128, blank=True)
+    status = models.CharField(max_length=12, choices=Status.choices, default=Status.UNDER_REVIEW)
+    insurer = models.ForeignKey(Insurer, null=True, blank=True, on_delete=models.PROTECT, related_name="claims")
     discharge_date = models.DateField(null=True, blank=True)
     cpt_codes = models.JSONField(default=list, blank=True)
     denial_reason = models.TextField(blank=True)
@@ -25,19 +90,33 @@ class Claim(models.Model):
     detail_info = models.JSONField(default=dict, blank=True)
 
     need_review = models.BooleanField(default=False)
+    denial = models.ForeignKey(DenialReason, null=True, blank=True,
+                               on_delete=models.SET_NULL, related_name="claims")
+
+    objects = TenantManager()
+
     class Meta:
         ordering = ["-updated_at"]
+        indexes = [
+            models.Index(fields=["discharge_date"], name="claim_discharge_date_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(check=models.Q(status__in=ClaimStatus.values), name="claim_status_valid"),
+        ]
 
     def __str__(self):
         return f"Claim {self.claim_id} – {self.patient_name}"
 
 
 class Note(models.Model):
+    tenant = models.CharField(max_length=32, blank=True, default=current_tenant, editable=False)
     claim = models.ForeignKey(Claim, on_delete=models.CASCADE, related_name="notes")
     body = models.TextField()
     author_name = models.CharField(max_length=64)
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = TenantManager()
+
     class Meta:
         ordering = ["-created_at"]
 
@@ -73,4 +152,181 @@ class Note(models.Model):
         else:
             text = unit(total, "second")
 
-        return (f"in {text}" if future else f"{text} ago")
\ No newline at end of file
+        return (f"in {text}" if future else f"{text} ago")
+
+
+class ClaimRollup(models.Model):
+    """Pre-aggregated claim measures per (insurer, status, discharge month)."""
+    insurer = models.ForeignKey(Insurer, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    status = models.CharField(max_length=12, choices=ClaimStatus.choices)
+    discharge_month = models.CharField(max_length=7, blank=True)  # "YYYY-MM", "" when unknown
+
+    claim_count = models.IntegerField(default=0)
+    need_review_count = models.IntegerField(default=0)
+    billed_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    paid_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    underpaid_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["insurer", "status", "discharge_month"]
+        constraints = [
+            models.UniqueConstraint(fields=["insurer", "status", "discharge_month"],
+                                    name="uniq_claim_rollup_group"),
+        ]
+
+    def __str__(self):
+        return f"{self.insurer_id or '—'} / {self.status} / {self.discharge_month or '—'}"
+
+
+class DenialRollup(models.Model):
+    """Pre-aggregated claim measures per (denial reason, insurer)."""
+    reason = models.ForeignKey(DenialReason, on_delete=models.CASCADE, related_name="rollups")
+    insurer = models.ForeignKey(Insurer, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+
+    claim_count = models.IntegerField(default=0)
+    billed_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    underpaid_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["reason", "insurer"], name="uniq_denial_rollup_group"),
+        ]
+
+    def __str__(self):
+        return f"{self.reason_id} / {self.insurer_id or '—'}"
+
+
+class Job(models.Model):
+    """Background job (import / recompute) picked up by `manage.py runworker`."""
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    ACTIVE_STATUSES = ("queued", "running")
+
+    kind = models.CharField(max_length=32)
+    tenant = models.CharField(max_length=32, blank=True)  # whose database the job runs against
+    options = models.JSONField(default=dict, blank=True)
+    input_path = models.CharField(max_length=512, blank=True)
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default="queued", db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=128, blank=True)  # "host:pid" of the runworker owning it
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            # At most one queued/running job per input fingerprint.
+            models.UniqueConstraint(fields=["fingerprint"],
+                                    condition=models.Q(status__in=("queued", "running")) & ~models.Q(fingerprint=""),
+                                    name="uniq_active_job_fingerprint"),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} {self.kind} [{self.status}]"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+
+class ClaimEvent(models.Model):
+    """Short-lived change event used to fan live updates out across server processes."""
+    claim_pk = models.BigIntegerField()
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Event {self.pk} for claim {self.claim_pk}"
+
+
+class ClaimChange(models.Model):
+    """
+    Append-only claim history (see claims/audit.py): one row per claim write,
+    holding only the changed fields as {field: [old, new]}. `month` is the
+    partition key that compact_audit works through.
+    """
+    OP_CHOICES = [
+        ("c", "Created"),
+        ("u", "Updated"),
+        ("m", "Merged (compacted)"),
+    ]
+
+    claim_pk = models.BigIntegerField()
+    month = models.CharField(max_length=7)  # "YYYY-MM" of changed_at (UTC)
+    changed_at = models.DateTimeField(default=timezone.now)
+    op = models.CharField(max_length=1, choices=OP_CHOICES, default="u")
+    source = models.CharField(max_length=32, blank=True)  # e.g. "load_claims", "flag_set"
+    changes = models.JSONField(default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["claim_pk", "changed_at"], name="claimchange_claim_time_idx"),
+            models.Index(fields=["month", "claim_pk"], name="claimchange_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"Claim {self.claim_pk} {self.get_op_display()} at {self.changed_at:%Y-%m-%d %H:%M}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not kwargs.get("force_insert"):
+            raise ValueError("ClaimChange rows are append-only.")
+        super().save(*args, **kwargs)
+
+
+class SavedSearch(models.Model):
+    """A reviewer's saved index filter; hot ones get a materialized work queue (see claims/queues.py)."""
+    DATE_ORDER_CHOICES = [
+        ("newest", "Newest first"),
+        ("oldest", "Oldest first"),
+    ]
+
+    owner = models.CharField(max_length=150)  # username, or the session's guest id
+    name = models.CharField(max_length=80)
+    q = models.CharField(max_length=200, blank=True)
+    status = models.CharField(max_length=12, choices=ClaimStatus.choices, blank=True)
+    date_order = models.CharField(max_length=6, choices=DATE_ORDER_CHOICES, default="newest")
+
+    use_count = models.PositiveIntegerField(default=0)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    materialized = models.BooleanField(default=False)
+    refreshed_at = models.DateTimeField(null=True, blank=True)  # last full rebuild of the queue
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "name"], name="uniq_saved_search_name"),
+        ]
+        verbose_name_plural = "saved searches"
+
+    def __str__(self):
+        return f"{self.name} ({self.owner})"
+
+
+class WorkQueueEntry(models.Model):
+    """One claim in a materialized saved search, ordered by sort_key."""
+    search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="entries")
+    claim = models.ForeignKey(Claim, on_delete=models.CASCADE, related_name="+")
+    sort_key = models.CharField(max_length=40)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["search", "claim"], name="uniq_queue_claim"),
+        ]
+        indexes = [
+            models.Index(fields=["search", "sort_key"], name="queue_order_idx"),
+        ]
+        verbose_name_plural = "work queue entries"
+
+    def __str__(self):
+        return f"{self.search_id}: claim {self.claim_id}"
@@ -0,0 +1,197 @@
+# claims/queues.py
+"""
+Saved searches and the work queues materialized from them.
+
+A SavedSearch is a reviewer's index filter (q / status / date order). Once it
+has been opened HOT_USES times it is materialized: its matching claim ids are
+stored in WorkQueueEntry rows with a sort key that reproduces the index order,
+so opening the queue reads one index range instead of re-running the filtered
+scan and COUNT, and a claim's previous/next neighbours are single index seeks.
+
+Queues are kept current incrementally: writers feed before/after snapshots to
+a QueueDelta (like RollupDelta), and apply() re-files just the claims whose
+searched fields changed in every materialized queue. Anything that changes
+matches without touching a claim (e.g. a new insurer alias) needs
+`manage.py refresh_queues`.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import tenants
+from .models import Claim, Insurer, SavedSearch, WorkQueueEntry
+
+HOT_USES = 3  # opens before a saved search gets a materialized queue
+MAX_QUEUES = 50  # per tenant; every claim write re-files into each of them
+BATCH = 500
+
+# Claim fields a search filters or sorts on (claim_id and created_at never change).
+QUEUE_FIELDS = ("patient_name", "status", "insurer_id", "discharge_date")
+
+
+# Search cost guard: every word adds three substring scans and an insurer
+# subquery to the query, and a one-letter word matches nearly every claim.
+MIN_WORD = 2
+MAX_WORDS = 4
+
+
+# ---------- Filtering ----------
+def search_tokens(q: str) -> tuple[list[str], list[str]]:
+    """(words searched, words ignored): words under MIN_WORD characters and past MAX_WORDS are dropped."""
+    used, ignored = [], []
+    for word in q.split():
+        (used if len(word) >= MIN_WORD and len(used) < MAX_WORDS else ignored).append(word)
+    return used, ignored
+
+
+def search_queryset(q: str = "", status: str = "", date_order: str = "newest"):
+    """
+    The index page's filter and order; the pk tie-break keeps pages (and queues)
+    stable. A query whose every word is dropped matches nothing rather than
+    falling through to an unfiltered scan of every claim.
+    """
+    used, ignored = search_tokens(q)
+    if ignored and not used:
+        return Claim.objects.none()
+    qs = Claim.objects.all()
+    for token in used:
+        # Insurer names match in the small dimension table; claims then filter on the integer FK.
+        insurers = Insurer.objects.filter(Q(name__icontains=token) | Q(aliases__key__icontains=token))
+        qs = qs.filter(
+            Q(claim_id__icontains=token) |
+            Q(patient_name__icontains=token) |
+            Q(insurer__in=insurers.values("pk"))
+        )
+    if status in Claim.Status.values:
+        qs = qs.filter(status=status)
+    if date_order == "oldest":
+        return qs.order_by(F("discharge_date").asc(nulls_first=True), "created_at", "pk")
+    return qs.order_by(F("discharge_date").desc(nulls_last=True), "-created_at", "-pk")
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MAX_DAY = 9_999_999
+_MAX_MICROS = 10 ** 17 - 1
+_MAX_PK = 10 ** 12 - 1
+
+
+def sort_key(date_order: str, pk: int, discharge_date, created_at) -> str:
+    """Fixed-width string whose ascending order is search_queryset's order."""
+    day = discharge_date.toordinal() if discharge_date else None
+    micros = (created_at - _EPOCH) // timedelta(microseconds=1)
+    if date_order == "oldest":  # dates ascending, nulls first
+        return f"{0 if day is None else 1}{day or 0:07d}{micros:017d}{pk:012d}"
+    return f"{1 if day is None else 0}{_MAX_DAY - (day or _MAX_DAY):07d}{_MAX_MICROS - micros:017d}{_MAX_PK - pk:012d}"
+
+
+def _entries(search, rows):
+    return [WorkQueueEntry(search=search, claim_id=pk, sort_key=sort_key(search.date_order, pk, d, c))
+            for pk, d, c in rows]
+
+
+# ---------- Materializing ----------
+def materialize(search: SavedSearch) -> int:
+    """(Re)build `search`'s queue from scratch; returns its length."""
+    qs = search_queryset(search.q, search.status, search.date_order)
+    n = 0
+    with transaction.atomic(using=tenants.db()):
+        live = (SavedSearch.objects.filter(materialized=True).exclude(pk=search.pk)
+                .order_by(F("last_used_at").desc(nulls_last=True)).values_list("pk", flat=True))
+        evicted = list(live[MAX_QUEUES - 1:])
+        if evicted:
+            WorkQueueEntry.objects.filter(search__in=evicted).delete()
+            SavedSearch.objects.filter(pk__in=evicted).update(materialized=False, refreshed_at=None)
+
+        WorkQueueEntry.objects.filter(search=search).delete()
+        batch = []
+        for row in qs.values_list("pk", "discharge_date", "created_at").iterator(chunk_size=5000):
+            batch.append(row)
+            if len(batch) >= 5000:
+                WorkQueueEntry.objects.bulk_create(_entries(search, batch))
+                n, batch = n + len(batch), []
+        WorkQueueEntry.objects.bulk_create(_entries(search, batch))
+        n += len(batch)
+        search.materialized = True
+        search.refreshed_at = timezone.now()
+        search.save(update_fields=["materialized", "refreshed_at"])
+    return n
+
+
+def note_use(search: SavedSearch) -> None:
+    """Count one open of `search`, materializing its queue once it is hot."""
+    search.use_count += 1
+    search.last_used_at = timezone.now()
+    SavedSearch.objects.filter(pk=search.pk).update(use_count=F("use_count") + 1,
+                                                   last_used_at=search.last_used_at)
+    if not search.materialized and search.use_count >= HOT_USES:
+        materialize(search)
+
+
+def refile(claim_pks) -> None:
+    """Add, move or drop these claims in every materialized queue."""
+    pks = list(claim_pks)
+    if not pks:
+        return
+    searches = list(SavedSearch.objects.filter(materialized=True))
+    for search in searches:
+        qs = search_queryset(search.q, search.status, search.date_order).order_by()
+        for i in range(0, len(pks), BATCH):
+            chunk = pks[i:i + BATCH]
+            entries = _entries(search, qs.filter(pk__in=chunk).values_list("pk", "discharge_date", "created_at"))
+            kept = [e.claim_id for e in entries]
+            WorkQueueEntry.objects.filter(search=search, claim_id__in=chunk).exclude(claim_id__in=kept).delete()
+            WorkQueueEntry.objects.bulk_create(entries, update_conflicts=True,
+                                               unique_fields=["search", "claim"], update_fields=["sort_key"])
+
+
+class QueueDelta:
+    """Collects claims whose searched fields changed; apply() re-files them."""
+
+    def __init__(self):
+        self._pks: set[int] = set()
+
+    def __bool__(self):
+        return bool(self._pks)
+
+    def change(self, pk: int, before: dict | None, after: dict):
+        if before is None or any(before.get(f) != after.get(f) for f in QUEUE_FIELDS):
+            self._pks.add(pk)
+
+    def apply(self):
+        refile(self._pks)
+        self._pks.clear()
+
+
+# ---------- Reading ----------
+def neighbours(search: SavedSearch, claim_pk: int) -> tuple[int | None, int | None]:
+    """(previous, next) claim pk around `claim_pk` in the queue; (None, None) if it is not in it."""
+    key = (WorkQueueEntry.objects.filter(search=search, claim_id=claim_pk)
+           .values_list("sort_key", flat=True).first())
+    if key is None:
+        return None, None
+    entries = WorkQueueEntry.objects.filter(search=search)
+    prev_pk = entries.filter(sort_key__lt=key).order_by("-sort_key").values_list("claim_id", flat=True).first()
+    next_pk = entries.filter(sort_key__gt=key).order_by("sort_key").values_list("claim_id", flat=True).first()
+    return prev_pk, next_pk
+
+
+def neighbours_many(search: SavedSearch, claim_pks) -> dict[int, tuple[int | None, int | None]]:
+    """neighbours() for several claims, e.g. a table page: one range read when they sit close together."""
+    pks = list(claim_pks)
+    entries = WorkQueueEntry.objects.filter(search=search)
+    keys = sorted(entries.filter(claim_id__in=pks).values_list("sort_key", flat=True))
+    if not keys:
+        return {}
+    span = list(entries.filter(sort_key__gte=keys[0], sort_key__lte=keys[-1])
+                .order_by("sort_key").values_list("claim_id", flat=True)[:4 * len(pks) + 1])
+    if len(span) > 4 * len(pks):  # scattered over the queue: seek each one
+        return {pk: neighbours(search, pk) for pk in pks}
+    before = entries.filter(sort_key__lt=keys[0]).order_by("-sort_key").values_list("claim_id", flat=True).first()
+    after = entries.filter(sort_key__gt=keys[-1]).order_by("sort_key").values_list("claim_id", flat=True).first()
+    order = [before] + span + [after]
+    wanted = set(pks)
+    return {pk: (order[i - 1], order[i + 1]) for i, pk in enumerate(order) if pk in wanted and 0 < i < len(order) - 1}
@@ -0,0 +1,174 @@
+# claims/rollups.py
+"""
+Pre-aggregated claim rollups keyed on (insurer, status, discharge_month), plus
+per-(denial reason, insurer) rollups for the top denial reasons view.
+
+Writers (loaders, flag_set) collect per-claim before/after snapshots in a
+RollupDelta and apply it once per transaction; the analytics views only read
+rollup rows, so their cost depends on the number of groups, not claims.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from . import tenants
+from .models import Claim, ClaimRollup, DenialRollup
+
+ZERO = Decimal("0.00")
+CENT = Decimal("0.01")
+
+# Claim fields a rollup contribution depends on.
+ROLLUP_FIELDS = ("insurer_id", "status", "discharge_date", "billed_amount", "paid_amount", "need_review",
+                 "denial_id")
+
+_MEASURES = ("claim_count", "need_review_count", "billed_total", "paid_total", "underpaid_total")
+_DENIAL_MEASURES = ("claim_count", "billed_total", "underpaid_total")
+
+
+def month_key(d) -> str:
+    return f"{d.year:04d}-{d.month:02d}" if d else ""
+
+
+def _dec(v) -> Decimal:
+    if v is None:
+        return ZERO
+    return (v if isinstance(v, Decimal) else Decimal(str(v))).quantize(CENT)
+
+
+def snapshot(claim, fields=ROLLUP_FIELDS) -> dict:
+    """Rollup-relevant (or other `fields`) values of a Claim instance or a values() dict."""
+    get = claim.get if isinstance(claim, dict) else (lambda k: getattr(claim, k, None))
+    return {k: get(k) for k in fields}
+
+
+class RollupDelta:
+    """Accumulates signed per-group measure changes; apply() writes them."""
+
+    def __init__(self):
+        self._groups: dict[tuple, list] = defaultdict(lambda: [0, 0, ZERO, ZERO, ZERO])
+        self._denials: dict[tuple, list] = defaultdict(lambda: [0, ZERO, ZERO])
+
+    def __bool__(self):
+        return bool(self._groups or self._denials)
+
+    def _add(self, snap: dict | None, sign: int):
+        if not snap:
+            return
+        key = (snap.get("insurer_id"), snap.get("status") or "", month_key(snap.get("discharge_date")))
+        billed = _dec(snap.get("billed_amount"))
+        paid = _dec(snap.get("paid_amount"))
+        underpaid = max(billed - paid, ZERO)
+        g = self._groups[key]
+        g[0] += sign
+        g[1] += sign if snap.get("need_review") else 0
+        g[2] += sign * billed
+        g[3] += sign * paid
+        g[4] += sign * underpaid
+
+        if snap.get("denial_id"):
+            d = self._denials[(snap["denial_id"], key[0])]
+            d[0] += sign
+            d[1] += sign * billed
+            d[2] += sign * underpaid
+
+    def add(self, snap: dict | None):
+        self._add(snap, 1)
+
+    def remove(self, snap: dict | None):
+        self._add(snap, -1)
+
+    def change(self, before: dict | None, after: dict | None):
+        if before == after:
+            return
+        self.remove(before)
+        self.add(after)
+
+    def apply(self):
+        """Write accumulated deltas (one UPDATE or INSERT per touched group)."""
+        if not self:
+            return
+        with transaction.atomic(using=tenants.db()):
+            for (insurer, status, month), d in self._groups.items():
+                if not any(d):
+                    continue
+                delta = dict(zip(_MEASURES, d))
+                rows = ClaimRollup.objects.filter(insurer=insurer, status=status, discharge_month=month)
+                if not rows.update(**{m: F(m) + v for m, v in delta.items()}):
+                    ClaimRollup.objects.create(insurer_id=insurer, status=status, discharge_month=month, **delta)
+            ClaimRollup.objects.filter(claim_count__lte=0).delete()
+
+            for (reason_id, insurer), d in self._denials.items():
+                if not any(d):
+                    continue
+                delta = dict(zip(_DENIAL_MEASURES, d))
+                rows = DenialRollup.objects.filter(reason_id=reason_id, insurer=insurer)
+                if not rows.update(**{m: F(m) + v for m, v in delta.items()}):
+                    DenialRollup.objects.create(reason_id=reason_id, insurer_id=insurer, **delta)
+            DenialRollup.objects.filter(claim_count__lte=0).delete()
+        self._groups.clear()
+        self._denials.clear()
+
+
+def _underpay_expr():
+    money = DecimalField(max_digits=14, decimal_places=2)
+    return Case(
+        When(billed_amount__gt=F("paid_amount"),
+             then=ExpressionWrapper(F("billed_amount") - F("paid_amount"), output_field=money)),
+        default=Value(ZERO),
+        output_field=money,
+    )
+
+
+def rebuild_denial_rollups() -> int:
+    """Recompute DenialRollup from Claim. Returns the number of groups."""
+    groups = (Claim.objects
+              .filter(denial__isnull=False)
+              .order_by()
+              .values("denial_id", "insurer")
+              .annotate(claim_count=Count("id"),
+                        billed_total=Sum("billed_amount"),
+                        underpaid_total=Sum(_underpay_expr())))
+    rows = [DenialRollup(reason_id=g["denial_id"], insurer_id=g["insurer"],
+                         claim_count=g["claim_count"],
+                         billed_total=_dec(g["billed_total"]),
+                         underpaid_total=_dec(g["underpaid_total"]))
+            for g in groups.iterator()]
+    with transaction.atomic(using=tenants.db()):
+        DenialRollup.objects.all().delete()
+        DenialRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild_rollups() -> int:
+    """Recompute every ClaimRollup row from Claim. Returns the number of groups."""
+    underpay_expr = _underpay_expr()
+    groups = (Claim.objects
+              .order_by()
+              .values("insurer", "status", month=TruncMonth("discharge_date"))
+              .annotate(claim_count=Count("id"),
+                        need_review_count=Count("id", filter=Q(need_review=True)),
+                        billed_total=Sum("billed_amount"),
+                        paid_total=Sum("paid_amount"),
+                        underpaid_total=Sum(underpay_expr)))
+
+    merged: dict[tuple, ClaimRollup] = {}
+    for g in groups.iterator():
+        key = (g["insurer"], g["status"] or "", month_key(g["month"]))
+        row = merged.get(key)
+        if row is None:
+            row = merged[key] = ClaimRollup(insurer_id=key[0], status=key[1], discharge_month=key[2])
+        row.claim_count += g["claim_count"]
+        row.need_review_count += g["need_review_count"]
+        row.billed_total += _dec(g["billed_total"])
+        row.paid_total += _dec(g["paid_total"])
+        row.underpaid_total += _dec(g["underpaid_total"])
+
+    with transaction.atomic(using=tenants.db()):
+        ClaimRollup.objects.all().delete()
+        ClaimRollup.objects.bulk_create(merged.values(), batch_size=1000)
+    return len(merged)
@@ -0,0 +1,273 @@
+// claims/static/claims/app.js
+// keep the position of the page after flag a claim
+(function () {
+
+  const getScrollBox = () => document.getElementById('claims-table');
+
+  let lastWinScroll = 0;
+  let lastBoxScroll = null;
+
+
+  document.addEventListener('htmx:beforeRequest', function (ev) {
+    const detail = ev.detail || {};
+    const target = detail.target;
+    if (!target || !target.id || !target.id.startsWith('flag-btn-')) return;
+
+    const box = getScrollBox();
+    lastBoxScroll = box ? box.scrollTop : null;
+    lastWinScroll = window.pageYOffset || document.documentElement.scrollTop || 0;
+
+
+    target.dataset._restoreScroll = '1';
+  });
+
+
+  document.addEventListener('htmx:afterSettle', function (ev) {
+    const detail = ev.detail || {};
+    const target = detail.target;
+    if (!target || target.dataset._restoreScroll !== '1') return;
+
+    const box = getScrollBox();
+
+
+    requestAnimationFrame(() => {
+      requestAnimationFrame(() => {
+        if (box != null && lastBoxScroll != null) {
+          box.scrollTop = lastBoxScroll;
+        }
+        try {
+          window.scrollTo({ top: lastWinScroll, left: 0, behavior: 'auto' });
+        } catch (e) {
+          window.scrollTo(0, lastWinScroll);
+        }
+
+        delete target.dataset._restoreScroll;
+      });
+    });
+  });
+
+  document.body.addEventListener('close-modal', function () {
+    const modal = document.getElementById('modal');
+    if (modal) modal.innerHTML = '';
+  });
+})();
+
+
+document.body.addEventListener('htmx:configRequest', function (e) {
+
+  const form = e.target.closest && e.target.closest('form');
+  let token = form && form.querySelector('input[name=csrfmiddlewaretoken]')?.value;
+  if (!token) {
+    const m = document.cookie.match(/csrftoken=([^;]+)/);
+    if (m) token = m[1];
+  }
+  if (token) e.detail.headers['X-CSRFToken'] = token;
+});
+
+
+// detail panels: a client-side cache keyed by panel URL. When the browser is
+// idle the visible rows' panels arrive in one batched request, so View usually
+// opens without a request; rows hovered before that and, in a work queue, the
+// "Next" panel are gathered for a moment and fetched through the same batch
+// endpoint. Prefetching never goes through the detail view itself, so it
+// cannot use up the throttle budget a real click needs. Entries expire after
+// a minute and are dropped when this page changes a claim or a live update
+// names one.
+(function () {
+  const TTL = 60000;
+  const BATCH = 50;  // server-side DETAIL_BATCH_MAX
+  const panels = new Map();  // url -> { pk, at, html: Promise<string|null>, ready: string|null }
+  const idle = window.requestIdleCallback || function (fn) { return setTimeout(fn, 200); };
+
+  function fresh(url) {
+    const e = panels.get(url);
+    if (e && Date.now() - e.at < TTL) return e;
+    panels.delete(url);
+    return null;
+  }
+
+  function put(url, promise) {
+    const m = url.match(/\/(\d+)\/(?:\?|$)/);
+    const e = { pk: m ? m[1] : null, at: Date.now(), ready: null, html: null };
+    e.html = promise.then(function (html) {
+      if (html === null) {
+        if (panels.get(url) === e) panels.delete(url);
+      } else {
+        e.ready = html;
+      }
+      return html;
+    });
+    panels.set(url, e);
+    return e;
+  }
+
+  function load(url) {
+    const e = fresh(url) || put(url, fetch(url, { headers: { 'HX-Request': 'true' } })
+      .then(r => (r.ok ? r.text() : null), () => null));
+    return e.html;
+  }
+
+  function show(url) {
+    load(url).then(function (html) {
+      const box = document.getElementById('detail-panel');
+      if (!box) return;
+      if (html === null) {
+        htmx.ajax('GET', url, { target: '#detail-panel', swap: 'innerHTML' });
+        return;
+      }
+      box.innerHTML = html;
+      htmx.process(box);
+      prefetchNext();
+    });
+  }
+
+  function prefetchNext() {
+    const nav = document.getElementById('queue-nav');
+    if (nav && nav.dataset.next) prefetch(nav.dataset.next);
+  }
+
+  // hovered rows and "Next" panels: one batch request per pause
+  const pending = new Set();
+  let prefetchTimer = null;
+  function prefetch(url) {
+    if (fresh(url)) return;
+    pending.add(url);
+    clearTimeout(prefetchTimer);
+    prefetchTimer = setTimeout(function () {
+      const urls = Array.from(pending).filter(u => !fresh(u));
+      pending.clear();
+      fetchBatch(urls);
+    }, 150);
+  }
+
+  function rowUrl(el) {
+    const btn = el && el.querySelector('.btn-view[hx-get]');
+    return btn ? btn.getAttribute('hx-get') : null;
+  }
+
+  // panel URLs through the batch endpoint, BATCH per request and one request
+  // per ?queue= (a miss is left to the click, which then asks the detail view)
+  function fetchBatch(urls) {
+    const table = document.getElementById('claims-table');
+    if (!table || !table.dataset.batchUrl) return;
+    const byQuery = new Map();
+    urls.forEach(function (url) {
+      const query = url.split('?')[1] || '';
+      if (!byQuery.has(query)) byQuery.set(query, []);
+      byQuery.get(query).push(url);
+    });
+    byQuery.forEach(function (group, query) {
+      for (let i = 0; i < group.length; i += BATCH) {
+        const chunk = group.slice(i, i + BATCH);
+        const pks = chunk.map(url => url.match(/\/(\d+)\//)[1]);
+        const batch = fetch(table.dataset.batchUrl + '?pks=' + pks.join(',') + (query ? '&' + query : ''))
+          .then(r => (r.ok ? r.json() : null), () => null);
+        chunk.forEach(function (url) {
+          put(url, batch.then(j => (j && j.panels && j.panels[url]) || null));
+        });
+      }
+    });
+  }
+
+  // every visible row not cached yet
+  function warmRows() {
+    const table = document.getElementById('claims-table');
+    if (!table) return;
+    fetchBatch(Array.from(table.querySelectorAll('tbody tr')).map(rowUrl)
+      .filter(url => url && !fresh(url)));
+  }
+
+  let warmTimer = null;
+  function warmSoon() {
+    clearTimeout(warmTimer);  // the table changes on every search keystroke; warm the last one
+    warmTimer = setTimeout(function () { idle(warmRows); }, 300);
+  }
+
+  document.addEventListener('htmx:beforeRequest', function (ev) {
+    const d = ev.detail || {};
+    if (!d.target || d.target.id !== 'detail-panel') return;
+    const url = d.pathInfo && d.pathInfo.requestPath;
+    if (!url || !fresh(url)) return;
+    ev.preventDefault();
+    show(url);
+  });
+
+  document.addEventListener('htmx:afterSettle', function (ev) {
+    const target = (ev.detail || {}).target;
+    if (!target) return;
+    if (target.id === 'detail-panel') prefetchNext();
+    if (target.id === 'claims-table') warmSoon();
+  });
+
+  // anything this page posts (notes, flags) may change a cached panel
+  document.addEventListener('htmx:afterRequest', function (ev) {
+    const cfg = (ev.detail || {}).requestConfig || {};
+    if (cfg.verb && cfg.verb !== 'get') {
+      panels.clear();
+      warmSoon();
+    }
+  });
+
+  // live updates (index.html): {pk} for one claim, {} after missed events
+  document.addEventListener('claims:changed', function (ev) {
+    const pk = ev.detail && ev.detail.pk;
+    panels.forEach(function (e, url) {
+      if (!pk || e.pk === String(pk)) panels.delete(url);
+    });
+  });
+
+  document.addEventListener('mouseover', function (ev) {
+    const row = ev.target.closest && ev.target.closest('#claims-table tbody tr');
+    const url = rowUrl(row);
+    if (url) prefetch(url);
+  });
+
+  document.addEventListener('click', function (ev) {
+    const link = ev.target.closest && ev.target.closest('#queue-nav [data-panel]');
+    if (!link) return;
+    ev.preventDefault();
+    show(link.dataset.panel);
+  });
+
+  warmSoon();
+})();
+
+
+// load shedding: a 429/503 answer is a notice for #busy-notice (the server
+// retargets it there); show it, then repeat the GET after Retry-After unless
+// something newer was requested in the meantime
+(function () {
+  let retry = null;
+
+  function clearNotice() {
+    const box = document.getElementById('busy-notice');
+    if (box) box.innerHTML = '';
+  }
+
+  document.addEventListener('htmx:beforeRequest', function () {
+    clearTimeout(retry);
+    retry = null;
+  });
+
+  document.addEventListener('htmx:beforeSwap', function (ev) {
+    const d = ev.detail || {};
+    const status = d.xhr && d.xhr.status;
+    if (status !== 429 && status !== 503) {
+      if (status && status < 400) clearNotice();
+      return;
+    }
+    d.shouldSwap = true;
+    d.isError = false;
+
+    const cfg = d.requestConfig || {};
+    if (cfg.verb !== 'get' || !cfg.target) return;
+    const url = d.xhr.responseURL;
+    const target = cfg.target;
+    const seconds = parseInt(d.xhr.getResponseHeader('Retry-After'), 10) || 1;
+    retry = setTimeout(function () {
+      retry = null;
+      clearNotice();
+      htmx.ajax('GET', url, { target: target, swap: 'innerHTML' });
+    }, Math.min(seconds, 10) * 1000);
+  });
+})();
@@ -0,0 +1,10 @@
+# claims/templatetags/claims_tags.py
+from django import template
+
+register = template.Library()
+
+
+@register.inclusion_tag("claims/_flag_button.html")
+def flag_button(claim, flag_url=""):
+    """The flag-for-review button; table rows pass their precomputed flag_url to skip the {% url %}."""
+    return {"claim": claim, "flag_url": flag_url}
@@ -0,0 +1,163 @@
+# claims/tenants.py
+"""
+Client organizations (tenants), one database each.
+
+settings.CLAIM_TENANTS maps a tenant slug to its SQLite file and settings.py
+adds a database alias "tenant_<slug>" for each. A tenant's claim data (claims,
+notes, insurers, denial reasons, rollups, history) lives in its own database;
+jobs, live events, users and sessions stay in "default". Separate files mean
+separate write locks, so imports for different tenants run side by side.
+
+The current tenant is a context variable:
+- TenantMiddleware binds it per request from the host (acme.claims.example.com),
+- commands bind it with --tenant (or $CLAIMS_TENANT), the job runner per job,
+- TenantRouter sends claims queries to its database; code that opens a
+  transaction or a cursor itself uses db().
+Claim and Note rows also carry the tenant key and their default managers filter
+on it, so a query that somehow reached another tenant's database finds nothing.
+With no tenants configured everything runs in "default", as before.
+"""
+from __future__ import annotations
+
+import functools
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import models
+from django.http import HttpResponseNotFound
+
+DEFAULT_DB = "default"
+DB_PREFIX = "tenant_"
+# claims models that are shared by every tenant and stay in "default"
+SHARED_MODELS = {"job", "claimevent"}
+
+_current: ContextVar[str] = ContextVar("claims_tenant", default="")
+
+
+class UnknownTenant(LookupError):
+    pass
+
+
+def configured() -> dict:
+    """{slug: database file} from settings.CLAIM_TENANTS."""
+    return getattr(settings, "CLAIM_TENANTS", None) or {}
+
+
+def db_alias(tenant: str) -> str:
+    """Database alias holding `tenant`'s claims; "" is the default database."""
+    if not tenant:
+        return DEFAULT_DB
+    if tenant not in configured():
+        raise UnknownTenant(tenant)
+    return DB_PREFIX + tenant
+
+
+def current() -> str:
+    """Slug of the bound tenant, "" when none is."""
+    return _current.get()
+
+
+def db() -> str:
+    """Database alias of the bound tenant."""
+    return db_alias(_current.get())
+
+
+@contextmanager
+def use_tenant(tenant: str):
+    """Bind `tenant` ("" for the default database) for the enclosed block."""
+    db_alias(tenant)
+    token = _current.set(tenant or "")
+    try:
+        yield tenant
+    finally:
+        _current.reset(token)
+
+
+class TenantManager(models.Manager):
+    """Default manager of tenant-keyed models: only the bound tenant's rows."""
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        tenant = _current.get()
+        return qs.filter(tenant=tenant) if tenant else qs
+
+
+class TenantRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == "claims" and model._meta.model_name not in SHARED_MODELS:
+            return db_alias(_current.get())
+        return None
+
+    db_for_write = db_for_read
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not db.startswith(DB_PREFIX):
+            return None
+        # Tenant databases hold only the sharded claims tables. Data migrations
+        # (no model_name) run there too and must use schema_editor's alias.
+        return app_label == "claims" and (model_name is None or model_name not in SHARED_MODELS)
+
+
+# ---------- Requests ----------
+def tenant_for_host(host: str) -> str | None:
+    """Tenant named by the host's first label, else CLAIM_DEFAULT_TENANT; None if unknown."""
+    tenants = configured()
+    if not tenants:
+        return ""
+    label = host.split(":", 1)[0].split(".", 1)[0].lower()
+    if label in tenants:
+        return label
+    return getattr(settings, "CLAIM_DEFAULT_TENANT", "") or None
+
+
+class TenantMiddleware:
+    """Binds the request's tenant (also set as request.tenant); 404 for hosts that name none."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request.tenant = tenant_for_host(request.get_host())
+        if request.tenant is None:
+            return HttpResponseNotFound("Unknown client.")
+        with use_tenant(request.tenant):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.tenant = tenant_for_host(request.get_host())
+        if request.tenant is None:
+            return HttpResponseNotFound("Unknown client.")
+        with use_tenant(request.tenant):
+            return await self.get_response(request)
+
+
+# ---------- Commands ----------
+def add_tenant_argument(parser):
+    parser.add_argument("--tenant", default=os.environ.get("CLAIMS_TENANT", ""),
+                        help="Client whose database to use (settings.CLAIM_TENANTS; "
+                             "default: $CLAIMS_TENANT, else the default database).")
+
+
+def tenant_command(handle):
+    """Decorator for BaseCommand.handle: run it bound to the --tenant option."""
+    @functools.wraps(handle)
+    def wrapper(self, *args, **opts):
+        tenant = opts.get("tenant") or ""
+        try:
+            db_alias(tenant)
+        except UnknownTenant:
+            raise CommandError(f"Unknown tenant {tenant!r}; configured: {', '.join(configured()) or 'none'}.")
+        with use_tenant(tenant):
+            return handle(self, *args, **opts)
+    return wrapper
@@ -0,0 +1,189 @@
+# claims/throttle.py
+"""
+Load shedding for the busiest views (the claims list and the detail panel).
+
+ThrottleMiddleware applies settings.CLAIM_THROTTLE, keyed by view function name:
+- a token bucket per client (session, else IP address; behind a proxy, set
+  CLAIM_THROTTLE_CLIENT_IP_HEADER): `rate` requests per second, with bursts
+  up to `burst`; past it -> 429,
+- a cap on requests of that view running at once in this process
+  (`concurrency`); past it -> 503 straight away instead of waiting for a
+  worker, so a pile-up cannot drag everyone's latency up with it.
+Both answer with Retry-After and a small fragment that HTMX shows in the
+page's #busy-notice (app.js repeats the request after the delay). Under
+overload these come by the hundred, so ShedRequestFilter (see settings.LOGGING)
+keeps them out of the django.request warning log.
+
+State is in memory and per process: with N server processes a client can get
+N times the rate. It is for fairness between reviewers, not a security
+boundary. The search cost guard (short or too many words) lives with the
+search itself, in queues.search_queryset().
+"""
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+MAX_CLIENTS = 10_000  # buckets kept per view; least recently seen clients are dropped
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+
+    def take(self, now: float) -> float:
+        """0 if a request may go ahead, else seconds until it may."""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Limiter:
+    """One view's buckets and in-flight count."""
+
+    def __init__(self, rate: float, burst: float, concurrency: int):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.concurrency = concurrency
+        self.active = 0
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def wait(self, client: str) -> float:
+        if not self.rate:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+                if len(self._buckets) > MAX_CLIENTS:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            return bucket.take(now)
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self.concurrency and self.active >= self.concurrency:
+                return False
+            self.active += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.active -= 1
+
+
+_limiters: dict[str, Limiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(view_name: str) -> Limiter | None:
+    """The view's Limiter under the current settings, or None when it is not throttled."""
+    rule = (getattr(settings, "CLAIM_THROTTLE", None) or {}).get(view_name)
+    if not rule:
+        return None
+    spec = (float(rule.get("rate") or 0), float(rule.get("burst") or 1), int(rule.get("concurrency") or 0))
+    lim = _limiters.get(view_name)
+    if lim is None or (lim.rate, lim.burst, lim.concurrency) != (spec[0], max(spec[1], 1), spec[2]):
+        with _limiters_lock:  # first use, or the settings changed (tests, benchmarks)
+            lim = _limiters[view_name] = Limiter(*spec)
+    return lim
+
+
+def client_ip(request) -> str:
+    """
+    REMOTE_ADDR, or with settings.CLAIM_THROTTLE_CLIENT_IP_HEADER (e.g.
+    "X-Forwarded-For") the last address in that header: the one the trusted
+    proxy in front of us appended, which a client cannot forge.
+    """
+    header = getattr(settings, "CLAIM_THROTTLE_CLIENT_IP_HEADER", "")
+    forwarded = request.headers.get(header, "") if header else ""
+    return forwarded.rsplit(",", 1)[-1].strip() or request.META.get("REMOTE_ADDR", "")
+
+
+def client_key(request) -> str:
+    session = getattr(request, "session", None)
+    key = session.session_key if session is not None else None
+    return f"s:{key}" if key else f"ip:{client_ip(request)}"
+
+
+def busy_response(request, status: int, retry_after: float):
+    seconds = max(1, math.ceil(retry_after))
+    html = render_to_string("claims/_busy.html", {"rate_limited": status == 429, "seconds": seconds}, request)
+    resp = HttpResponse(html, status=status)
+    resp["Retry-After"] = str(seconds)
+    resp["Cache-Control"] = "no-store"
+    request.shed = True  # for ShedRequestFilter
+    if request.headers.get("HX-Request"):
+        resp["HX-Retarget"] = "#busy-notice"
+        resp["HX-Reswap"] = "innerHTML"
+    return resp
+
+
+class ShedRequestFilter(logging.Filter):
+    """Logging filter for django.request: drops the records of requests this module shed."""
+
+    def filter(self, record):
+        return not getattr(getattr(record, "request", None), "shed", False)
+
+
+class ThrottleMiddleware:
+    """Rate and concurrency limits per settings.CLAIM_THROTTLE; place after SessionMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self._release(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            self._release(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        lim = limiter(getattr(view_func, "__name__", ""))
+        if lim is None:
+            return None
+        wait = lim.wait(client_key(request))
+        if wait:
+            return busy_response(request, 429, wait)
+        if not lim.enter():
+            return busy_response(request, 503, 1)
+        request._throttle_limiter = lim
+        return None
+
+    @staticmethod
+    def _release(request):
+        lim = request.__dict__.pop("_throttle_limiter", None)
+        if lim is not None:
+            lim.leave()
@@ -6,13 +6,24 @@ app_name = "claims"
 urlpatterns = [
     path("welcome/", views.welcome, name="welcome"),
     path("user/", views.index, name="index"),
+    path("user/searches/save/", views.search_save, name="search_save"),
+    path("user/searches/<int:pk>/", views.search_open, name="search_open"),
+    path("user/searches/<int:pk>/delete/", views.search_delete, name="search_delete"),
 
     path("claim/<int:pk>/", views.claim_detail, name="claim_detail"),
 
     path("detail/<int:pk>/", views.claim_detail, name="detail"),
+    path("detail/batch/", views.claim_details, name="claim_details"),
 
     path("dashboard/", views.admin_dashboard, name="admin_dashboard"),
+    path("dashboard/analytics/", views.analytics_dashboard, name="analytics_dashboard"),
+    path("dashboard/analytics/drilldown/", views.analytics_drilldown, name="analytics_drilldown"),
+    path("dashboard/denials/", views.denial_reasons, name="denial_reasons"),
+    path("dashboard/jobs/", views.jobs_page, name="jobs"),
+    path("dashboard/jobs/submit/", views.job_submit, name="job_submit"),
+    path("dashboard/jobs/<int:pk>/", views.job_status, name="job_status"),
     path("claims/<int:pk>/flag/confirm/", views.flag_confirm, name="flag_confirm"),
     path("flag/set/<int:pk>/", views.flag_set, name="flag_set"),
     path("note/add/<int:pk>/", views.add_note, name="add_note"),
+    path("events/", views.claim_events, name="claim_events"),
 ]
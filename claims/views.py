@@ -1,16 +1,32 @@
 # claims/views.py
 import re
 import json
+import time
+import uuid
 from decimal import Decimal
+from urllib.parse import urlencode
 
-from django.db.models import Q, F, Case, When, Value, DecimalField, ExpressionWrapper, Avg
+from asgiref.sync import sync_to_async
+from django.db.models import F, Case, When, Value, DecimalField, ExpressionWrapper, Avg, Sum
 from django.core.paginator import Paginator
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.views.decorators.http import require_http_methods, require_POST
 from django.contrib.auth import logout
-
-from .models import Claim
-from .forms import NoteForm
+from django.db import transaction
+
+from .models import Claim, ClaimRollup, DenialRollup, Insurer, Job, SavedSearch, WorkQueueEntry
+from .forms import NoteForm, ImportJobForm
+from . import jobs
+from . import events
+from . import tenants
+from . import queues
+from .queues import QueueDelta
+from .rollups import RollupDelta, snapshot
+from .audit import AuditLog
 from django.views.decorators.http import require_POST
 
 
@@ -53,8 +69,8 @@ def _extract_cpt_list(info):
 
 
 def _extract_insurer(claim, info):
-    if getattr(claim, "insurer", ""):
-        return claim.insurer
+    if getattr(claim, "insurer_id", None):
+        return claim.insurer.name
     if not isinstance(info, dict):
         return ""
     low = { (k or "").strip().lower(): v for k, v in info.items() }
@@ -102,6 +118,7 @@ def admin_dashboard(request):
 
     flagged = (Claim.objects
                .filter(need_review=True)
+               .select_related("insurer")
                .annotate(underpayment=underpay_expr)
                .order_by("-created_at"))
 
@@ -116,69 +133,389 @@ def admin_dashboard(request):
     return render(request, "claims/admin_dashboard.html", ctx)
 
 
+# ---------- Analytics dashboard (reads ClaimRollup only) ----------
+ROLLUP_DIMENSIONS = {"insurer", "status", "discharge_month"}
+
+
+def _rollup_measures():
+    return {
+        "claims": Sum("claim_count"),
+        "denied": Sum(Case(When(status="denied", then=F("claim_count")), default=Value(0))),
+        "need_review": Sum("need_review_count"),
+        "billed": Sum("billed_total"),
+        "paid": Sum("paid_total"),
+        "underpaid": Sum("underpaid_total"),
+    }
+
+
+def _with_ratios(r):
+    claims = r["claims"] or 0
+    billed = r["billed"] or Decimal("0.00")
+    r["denial_rate"] = (r["denied"] * 100 / claims) if claims else 0
+    r["paid_ratio"] = (r["paid"] * 100 / billed) if billed else 0
+    return r
+
+
+def _rollup_breakdown(qs, dim):
+    """Rows keyed on `dim`; `key` goes into drill-down URLs, `label` is shown."""
+    if dim == "insurer":
+        rows = qs.values("insurer", "insurer__name").annotate(**_rollup_measures()).order_by("insurer__name")
+        return [_with_ratios(dict(r, key=r["insurer"] or "", label=r["insurer__name"] or "")) for r in rows]
+    rows = qs.values(dim).annotate(**_rollup_measures()).order_by(dim)
+    labels = STATUS_LABELS if dim == "status" else {}
+    return [_with_ratios(dict(r, key=r[dim], label=labels.get(r[dim], r[dim]))) for r in rows]
+
+
+def _insurer_param(request):
+    """?insurer=<Insurer id>, "" for claims without one; (None, "") when absent or malformed."""
+    raw = request.GET.get("insurer")
+    if raw is None or (raw and not raw.isdigit()):
+        return None, ""
+    if not raw:
+        return "", ""
+    return raw, Insurer.objects.filter(pk=raw).values_list("name", flat=True).first() or ""
+
+
+@require_http_methods(["GET"])
+def analytics_dashboard(request):
+    ctx = {
+        "by_insurer": _rollup_breakdown(ClaimRollup.objects.all(), "insurer"),
+        "by_status": _rollup_breakdown(ClaimRollup.objects.all(), "status"),
+        "totals": _with_ratios(ClaimRollup.objects.aggregate(**_rollup_measures())),
+    }
+    return render(request, "claims/analytics_dashboard.html", ctx)
+
+
+@require_http_methods(["GET"])
+def analytics_drilldown(request):
+    """HTMX fragment: one insurer (and optionally status) broken down by `by`."""
+    insurer, insurer_name = _insurer_param(request)
+    status = (request.GET.get("status") or "").strip()
+    if status not in Claim.Status.values:
+        status = ""
+    dim = request.GET.get("by") or "status"
+    if dim not in ROLLUP_DIMENSIONS:
+        dim = "status"
+
+    qs = ClaimRollup.objects.all()
+    if insurer is not None:
+        qs = qs.filter(insurer=insurer or None)
+    if status:
+        qs = qs.filter(status=status)
+
+    ctx = {
+        "rows": _rollup_breakdown(qs, dim),
+        "dim": dim,
+        "insurer": insurer,
+        "insurer_name": insurer_name,
+        "status": status,
+        "status_label": STATUS_LABELS.get(status, ""),
+    }
+    return render(request, "claims/_analytics_breakdown.html", ctx)
+
+
+# ---------- Top denial reasons (reads DenialRollup only) ----------
+TOP_DENIALS = 10
+
+
+@require_http_methods(["GET"])
+def denial_reasons(request):
+    insurer, insurer_name = _insurer_param(request)
+    order = request.GET.get("order") or "count"
+
+    qs = DenialRollup.objects.all()
+    if insurer:
+        qs = qs.filter(insurer=insurer)
+    rows = (qs.values("reason_id", "reason__text")
+            .annotate(claims=Sum("claim_count"), billed=Sum("billed_total"), underpaid=Sum("underpaid_total"))
+            .order_by("-billed" if order == "dollars" else "-claims", "reason__text"))[:TOP_DENIALS]
+
+    ctx = {
+        "rows": rows,
+        "insurer": insurer or "",
+        "insurer_name": insurer_name,
+        "order": order,
+    }
+    if request.headers.get("HX-Request"):
+        return render(request, "claims/_denial_table.html", ctx)
+    ctx["insurers"] = Insurer.objects.filter(pk__in=DenialRollup.objects.values("insurer")).values_list("pk", "name")
+    return render(request, "claims/denial_reasons.html", ctx)
+
+
+# ---------- Background jobs ----------
+RECENT_JOBS = 20
+
+
+def _job_ctx(job):
+    return {"job": job, "progress": jobs.read_progress(job) if job.status != "queued" else None}
+
+
+@require_http_methods(["GET"])
+def jobs_page(request):
+    ctx = {
+        "form": ImportJobForm(),
+        "job_rows": [_job_ctx(j) for j in Job.objects.filter(tenant=tenants.current())[:RECENT_JOBS]],
+    }
+    return render(request, "claims/jobs.html", ctx)
+
+
+@require_POST
+def job_submit(request):
+    kind = request.POST.get("kind")
+    if kind in {"rebuild_rollups", "find_duplicates"}:
+        job, created = jobs.submit_job(kind, tenant=tenants.current())
+    else:
+        form = ImportJobForm(request.POST, request.FILES)
+        if not form.is_valid():
+            # 200 so htmx applies the out-of-band error block
+            return render(request, "claims/_job_form_errors.html", {"form": form})
+        job, created = jobs.submit_upload(form.cleaned_data["kind"], form.cleaned_data["file"], form.job_options(),
+                                          tenant=tenants.current())
+
+    ctx = dict(_job_ctx(job), duplicate=not created)
+    if request.headers.get("HX-Request"):
+        return render(request, "claims/_job_row.html", ctx)
+    return redirect("claims:jobs")
+
+
+@require_http_methods(["GET"])
+def job_status(request, pk: int):
+    job = get_object_or_404(Job, pk=pk, tenant=tenants.current())
+    return render(request, "claims/_job_row.html", _job_ctx(job))
+
+
 # ---------- User list page ----------
 @require_http_methods(["GET"])
 def index(request):
+    ctx = _index_context(request)
+    if ctx["is_htmx"]:
+        return render(request, "claims/_claim_table.html", ctx)
+    ctx["saved_searches"] = SavedSearch.objects.filter(owner=_reviewer(request)).only(
+        "id", "name", "materialized")
+    return render(request, "claims/index.html", ctx)
+
+
+def _index_context(request):
     q = (request.GET.get("q") or "").strip()
     status = (request.GET.get("status") or "").strip()          # "", "denied", "paid", "under_review"
     date_order = (request.GET.get("date") or "newest").strip()   # "newest" | "oldest"
     page = request.GET.get("page")
+    if status not in Claim.Status.values:
+        status = ""
+    if date_order != "oldest":
+        date_order = "newest"
+
+    # An opened saved search with a materialized queue pages through its stored
+    # claim ids; once the filters are edited it is a plain search again.
+    queue = _saved_search(request, "search")
+    if queue is not None and (not queue.materialized or (queue.q, queue.status, queue.date_order) != (q, status, date_order)):
+        queue = None
+
+    if queue is not None:
+        ids = WorkQueueEntry.objects.filter(search=queue).order_by("sort_key").values_list("claim_id", flat=True)
+        paginator = Paginator(ids, PAGE_SIZE)
+        page_obj = paginator.get_page(page)
+        by_pk = _table_rows(Claim.objects.filter(pk__in=list(page_obj.object_list))).in_bulk()
+        claims = [by_pk[pk] for pk in page_obj.object_list if pk in by_pk]
+    else:
+        paginator = Paginator(_table_rows(queues.search_queryset(q, status, date_order)), PAGE_SIZE)
+        page_obj = paginator.get_page(page)
+        claims = page_obj.object_list
 
-    qs = Claim.objects.all()
-
-    if q:
-        for token in q.split():
-            qs = qs.filter(
-                Q(claim_id__icontains=token) |
-                Q(patient_name__icontains=token) |
-                Q(insurer__icontains=token)
-            )
-
-    if status in {"denied", "paid", "under_review"}:
-        qs = qs.filter(status=status)
+    used, ignored = queues.search_tokens(q)
+    return {
+        "claims": _with_display_fields(claims, queue),
+        "page_obj": page_obj,
+        "paginator": paginator,
+        "queue": queue,
+        "ignored_words": ignored,
+        "search_rejected": bool(ignored) and not used,
+        "min_word": queues.MIN_WORD,
+        "max_words": queues.MAX_WORDS,
+        "is_htmx": bool(request.headers.get("HX-Request")),
+    }
 
-    if date_order == "oldest":
-        qs = qs.order_by(F("discharge_date").asc(nulls_first=True), "created_at")
-    else:
-        qs = qs.order_by(F("discharge_date").desc(nulls_last=True), "-created_at")
 
-    qs = qs.only(
+def _table_rows(qs):
+    return qs.select_related("insurer").only(
         "id", "claim_id", "patient_name",
         "billed_amount", "paid_amount",
-        "status", "insurer",
+        "status", "insurer__name",
         "discharge_date", "created_at",
         "need_review",
     )
 
-    paginator = Paginator(qs, PAGE_SIZE)
-    page_obj = paginator.get_page(page)
 
-    is_htmx = bool(request.headers.get("HX-Request"))
-    ctx = {
-        "claims": page_obj.object_list,
-        "page_obj": page_obj,
-        "paginator": paginator,
-        "is_htmx": is_htmx,
-    }
-    if is_htmx:
-        return render(request, "claims/_claim_table.html", ctx)
-    return render(request, "claims/index.html", ctx)
+# ---------- Table row display fields ----------
+# Formatting and URLs are computed here once per row (plain str.format) instead of
+# running floatformat/intcomma/date filters and three {% url %} reversals per row.
+STATUS_LABELS = dict(Claim.STATUS_CHOICES)
+_PK_SENTINEL = 987654321
+
+
+def _pk_url(name):
+    return reverse(name, args=[_PK_SENTINEL]).replace(str(_PK_SENTINEL), "{}")
+
+
+def _with_display_fields(claims, queue=None):
+    # Opened from a work queue, the detail panel gets previous/next links.
+    detail_url = _pk_url("claims:detail") + (f"?queue={queue.pk}" if queue else "")
+    flag_url = _pk_url("claims:flag_confirm")
+    rows = list(claims)
+    for c in rows:
+        d = c.discharge_date
+        c.detail_url = detail_url.format(c.pk)
+        c.flag_url = flag_url.format(c.pk)
+        c.billed_display = f"{c.billed_amount or 0:,.2f}"
+        c.paid_display = f"{c.paid_amount or 0:,.2f}"
+        c.discharge_display = f"{d.month}/{d.day}/{d.year}" if d else ""
+        c.status_label = STATUS_LABELS.get(c.status, c.status)
+    return rows
 
 
 # ---------- Claim detail panel (for HTMX) ----------
+DETAIL_BATCH_MAX = PAGE_SIZE  # a table page of panels per batch request
+
+
+def _detail_rows(qs):
+    """Claims with what a panel shows: insurer joined, notes prefetched (one query for any number)."""
+    return qs.select_related("insurer").prefetch_related("notes")
+
+
 @require_http_methods(["GET"])
 def claim_detail(request, pk):
-    claim = get_object_or_404(Claim, pk=pk)
-    info = claim.detail_info if isinstance(claim.detail_info, dict) else {}
+    claim = get_object_or_404(_detail_rows(Claim.objects.all()), pk=pk)
+    queue = _work_queue(request)
+    nav = _queue_nav(queue, *queues.neighbours(queue, claim.pk)) if queue else None
+    return render(request, "claims/_detail_panel.html", _detail_context(claim, nav))
 
-    ctx = {
+
+@require_http_methods(["GET"])
+def claim_details(request):
+    """
+    Up to DETAIL_BATCH_MAX panels in one request (?pks=1,2,3, plus ?queue= like
+    the detail URL) as {"panels": {detail url: html}}; app.js caches them so a
+    click on View needs no request. ?format=data returns compact claim data instead.
+    """
+    pks = [int(p) for p in (request.GET.get("pks") or "").split(",") if p.strip().isdigit()]
+    claims = _detail_rows(Claim.objects.filter(pk__in=pks[:DETAIL_BATCH_MAX]).order_by("pk"))
+    if request.GET.get("format") == "data":
+        return JsonResponse({"claims": [_claim_data(c) for c in claims]})
+
+    queue = _work_queue(request)
+    around = queues.neighbours_many(queue, pks[:DETAIL_BATCH_MAX]) if queue else {}
+    detail_url = _pk_url("claims:detail") + (f"?queue={queue.pk}" if queue else "")
+    panels = {}
+    for claim in claims:
+        nav = _queue_nav(queue, *around.get(claim.pk, (None, None))) if queue else None
+        panels[detail_url.format(claim.pk)] = render_to_string(
+            "claims/_detail_panel.html", _detail_context(claim, nav), request)
+    return JsonResponse({"panels": panels})
+
+
+def _detail_context(claim, queue_nav=None):
+    info = claim.detail_info if isinstance(claim.detail_info, dict) else {}
+    return {
         "claim": claim,
+        "queue_nav": queue_nav,
         "note_form": NoteForm(),
         "insurer_display": _extract_insurer(claim, info),
         "cpt_list": _extract_cpt_list(info),
         "denial_text": _extract_denial(claim, info),
     }
-    return render(request, "claims/_detail_panel.html", ctx)
+
+
+def _claim_data(claim):
+    info = claim.detail_info if isinstance(claim.detail_info, dict) else {}
+    return {
+        "id": claim.pk,
+        "claim_id": claim.claim_id,
+        "patient_name": claim.patient_name,
+        "status": claim.status,
+        "need_review": claim.need_review,
+        "billed_amount": str(claim.billed_amount or 0),
+        "paid_amount": str(claim.paid_amount or 0),
+        "insurer": _extract_insurer(claim, info),
+        "discharge_date": claim.discharge_date.isoformat() if claim.discharge_date else None,
+        "cpt": _extract_cpt_list(info),
+        "denial": _extract_denial(claim, info) or "",
+        "notes": [{"author_name": n.author_name, "body": n.body, "created_at": n.created_at.isoformat()}
+                  for n in claim.notes.all()],
+    }
+
+
+def _work_queue(request):
+    """The materialized work queue named by ?queue=, or None."""
+    queue = _saved_search(request, "queue")
+    return queue if queue is not None and queue.materialized else None
+
+
+def _queue_nav(queue, prev_pk, next_pk):
+    url = _pk_url("claims:detail") + f"?queue={queue.pk}"
+    return {
+        "name": queue.name,
+        "prev_url": url.format(prev_pk) if prev_pk else "",
+        "next_url": url.format(next_pk) if next_pk else "",
+    }
+
+
+# ---------- Saved searches / work queues ----------
+def _reviewer(request) -> str:
+    """Owner of saved searches: the username, or a guest id kept in the session."""
+    if request.user.is_authenticated:
+        return request.user.get_username()
+    if "reviewer" not in request.session:
+        request.session["reviewer"] = f"guest:{uuid.uuid4().hex[:12]}"
+    return request.session["reviewer"]
+
+
+def _saved_search(request, param):
+    """The reviewer's SavedSearch named by ?<param>=<pk>, or None."""
+    raw = request.GET.get(param) or ""
+    if not raw.isdigit():
+        return None
+    return SavedSearch.objects.filter(pk=int(raw), owner=_reviewer(request)).first()
+
+
+def _search_url(search):
+    params = {"q": search.q, "status": search.status, "date": search.date_order, "search": search.pk}
+    return f"{reverse('claims:index')}?{urlencode(params)}"
+
+
+@require_POST
+def search_save(request):
+    name = (request.POST.get("name") or "").strip()[:80]
+    if not name:
+        return HttpResponse("A name is required.", status=400)
+    status = (request.POST.get("status") or "").strip()
+    search, created = SavedSearch.objects.update_or_create(
+        owner=_reviewer(request), name=name,
+        defaults={
+            "q": (request.POST.get("q") or "").strip()[:200],
+            "status": status if status in Claim.Status.values else "",
+            "date_order": "oldest" if request.POST.get("date") == "oldest" else "newest",
+        },
+    )
+    if not created and search.materialized:
+        queues.materialize(search)  # filters may have changed
+    if request.headers.get("HX-Request"):
+        resp = HttpResponse(status=204)
+        resp["HX-Redirect"] = _search_url(search)
+        return resp
+    return redirect(_search_url(search))
+
+
+@require_POST
+def search_open(request, pk: int):
+    search = get_object_or_404(SavedSearch, pk=pk, owner=_reviewer(request))
+    queues.note_use(search)
+    return redirect(_search_url(search))
+
+
+@require_POST
+def search_delete(request, pk: int):
+    SavedSearch.objects.filter(pk=pk, owner=_reviewer(request)).delete()
+    return redirect("claims:index")
 
 
 # ---------- Notes ----------
@@ -190,6 +527,7 @@ def add_note(request, pk):
         note = form.save(commit=False)
         note.claim = claim
         note.save()
+        events.publish_notes(claim)
         return render(request, "claims/_notes_list.html", {"claim": claim})
 
     resp = render(request, "claims/_notes_list.html", {"claim": claim})
@@ -200,7 +538,6 @@ def add_note(request, pk):
 # ---------- Flag (Review) ----------
 
 def _is_under_review(claim) -> bool:
-    status_norm = ((claim.status or "").strip().lower().replace(" ", "_"))
     return bool(getattr(claim, "need_review", False))
 
 @require_http_methods(["GET"])
@@ -214,15 +551,83 @@ def flag_confirm(request, pk: int):
 
 @require_POST
 def flag_set(request, pk: int):
-    claim = get_object_or_404(Claim, pk=pk)
-    if not _is_under_review(claim):
-        claim.need_review = True
-        status_norm = ((claim.status or "").strip().lower().replace(" ", "_"))
-        if status_norm != "under_review":
-            claim.status = "Under Review"
-        claim.save(update_fields=["need_review", "status"])
+    with transaction.atomic(using=tenants.db()):
+        claim = get_object_or_404(Claim.objects.select_for_update(), pk=pk)
+        if not _is_under_review(claim):
+            before = snapshot(claim)
+            # The conditional UPDATE decides: of two concurrent requests that both
+            # read need_review=False, only one flips the row and applies the deltas.
+            flipped = Claim.objects.filter(pk=claim.pk, need_review=False).update(
+                need_review=True, status=Claim.Status.UNDER_REVIEW.value)
+            claim.need_review = True
+            claim.status = Claim.Status.UNDER_REVIEW.value
+            if flipped:
+                after = snapshot(claim)
+                rollup = RollupDelta()
+                rollup.change(before, after)
+                rollup.apply()
+                queue = QueueDelta()
+                queue.change(claim.pk, before, after)
+                queue.apply()
+                audit = AuditLog("flag_set")
+                audit.record(claim.pk, before, after)
+                audit.flush()
+                events.publish_flag(claim)
 
     resp = render(request, "claims/_flag_button.html", {"claim": claim})
     resp["HX-Trigger"] = json.dumps({"close-modal": True})
     return resp
 
+
+# ---------- Live updates (SSE, ASGI only) ----------
+SSE_KEEPALIVE = 20
+# Django 4.2 does not notice a client that left mid-stream (and ASGI servers drop
+# the writes silently), so a stream would never end. Each one closes itself after
+# this long instead; EventSource reconnects with Last-Event-ID and gets what it missed.
+SSE_MAX_AGE = 120
+
+
+def _sse_event(ev):
+    head = f"id: {ev['id']}\n" if "id" in ev else ""
+    return f"{head}event: claim\ndata: {json.dumps(ev)}\n\n"
+
+
+async def claim_events(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI a stream would pin a worker thread; 204 tells EventSource not to reconnect.
+        return HttpResponse(status=204)
+
+    tenant = tenants.current()
+    last_id = request.headers.get("Last-Event-ID", "")
+
+    async def stream():
+        sub = events.bus.subscribe(tenant)
+        deadline = time.monotonic() + SSE_MAX_AGE
+        seen = 0
+        try:
+            yield "retry: 3000\n\n"
+            if last_id:
+                missed = await sync_to_async(events.replay_after)(last_id, tenant)
+                if missed is None:
+                    yield "event: resync\ndata: {}\n\n"
+                for ev in missed or ():
+                    seen = ev["id"]
+                    yield _sse_event(ev)
+            while (left := deadline - time.monotonic()) > 0:
+                batch = await sub.get(min(SSE_KEEPALIVE, left))
+                if batch is None:
+                    yield ": keepalive\n\n"
+                elif not batch:
+                    yield "event: resync\ndata: {}\n\n"
+                for ev in batch or ():
+                    if ev.get("id", 0) > seen:  # not already replayed
+                        yield _sse_event(ev)
+        finally:
+            events.bus.unsubscribe(sub)
+
+    resp = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"
+    return resp
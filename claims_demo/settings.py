@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,10 +46,13 @@ USE_TZ = True
 TIME_ZONE = "America/New_York"
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'claims.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'claims.tenants.TenantMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'claims.throttle.ThrottleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,9 +85,57 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # runworker processes and web requests share the file; wait for locks instead of failing fast
+        'OPTIONS': {'timeout': 20},
     }
 }
 
+# Client organizations (see claims/tenants.py), each in its own SQLite file next
+# to db.sqlite3: DJANGO_CLAIM_TENANTS=acme,globex -> db_acme.sqlite3, db_globex.sqlite3
+# under the aliases "tenant_acme", "tenant_globex". Requests pick the tenant from
+# the host (acme.claims.example.com, or acme.localhost in development); hosts that
+# name none get CLAIM_DEFAULT_TENANT. Empty: single tenant, all in 'default'.
+CLAIM_TENANTS = {t: BASE_DIR / f'db_{t}.sqlite3'
+                 for t in (s.strip().lower() for s in os.environ.get('DJANGO_CLAIM_TENANTS', '').split(',')) if t}
+for _tenant, _path in CLAIM_TENANTS.items():
+    DATABASES[f'tenant_{_tenant}'] = {**DATABASES['default'], 'NAME': _path}
+CLAIM_DEFAULT_TENANT = os.environ.get('DJANGO_CLAIM_DEFAULT_TENANT', '')
+DATABASE_ROUTERS = ['claims.tenants.TenantRouter']
+
+# Uploaded import files and job progress sidecars (see claims/jobs.py)
+JOBS_ROOT = BASE_DIR / 'var' / 'jobs'
+
+# Append-only claim change log (see claims/audit.py); compact with `manage.py compact_audit`.
+CLAIM_AUDIT = True
+
+# Live claim updates over SSE (see claims/events.py). "db" fans events out across
+# server processes and picks up changes from management commands; "memory" is
+# enough for a single ASGI process.
+CLAIM_EVENTS_BACKEND = 'db'
+
+
+# Load shedding for the busiest views (see claims/throttle.py), keyed by view
+# function name: `rate` requests/second per client with bursts up to `burst`,
+# at most `concurrency` running at once per server process. 0 turns a limit
+# off; drop a view (or the whole setting) to not throttle it.
+CLAIM_THROTTLE = {
+    'index': {'rate': 5, 'burst': 15, 'concurrency': 2},
+    'claim_detail': {'rate': 10, 'burst': 30, 'concurrency': 4},
+    'claim_details': {'rate': 2, 'burst': 6, 'concurrency': 2},  # batched panels, prefetch only
+}
+# Behind a reverse proxy every client shares its address: name the header the
+# proxy sets (e.g. X-Forwarded-For) and the last address in it keys the limits
+# of clients without a session. Only set it when such a proxy is always in front.
+CLAIM_THROTTLE_CLIENT_IP_HEADER = os.environ.get('DJANGO_CLAIM_THROTTLE_CLIENT_IP_HEADER', '')
+
+# Shed requests (429/503 from claims/throttle.py) are not logged as warnings.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {'shed_requests': {'()': 'claims.throttle.ShedRequestFilter'}},
+    'loggers': {'django.request': {'filters': ['shed_requests']}},
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -120,6 +172,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/4.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Responses smaller than this go out uncompressed (see claims/middleware.py).
+COMPRESS_MIN_SIZE = 1024
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
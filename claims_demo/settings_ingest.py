@@ -0,0 +1,25 @@
+"""
+Ingest profile for cron imports and job workers:
+DJANGO_SETTINGS_MODULE=claims_demo.settings_ingest
+
+Same database and claims settings as settings.py, but without the admin,
+auth, sessions, messages and staticfiles apps or any middleware, so
+django.setup() only loads what the loaders and runworker use. Do not run
+the web server or `migrate` with this profile. Measure with:
+    python manage.py startup_report --settings claims_demo.settings_ingest
+"""
+from .settings import *  # noqa: F401,F403
+
+INSTALLED_APPS = [
+    "django.contrib.humanize",  # templatetags only; used by fragments events.py may render
+    "claims",
+]
+
+MIDDLEWARE = []
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],  # noqa: F405
+        "OPTIONS": {"context_processors": []},
+    },
+]
@@ -0,0 +1,59 @@
+"""
+Production profile: DJANGO_SETTINGS_MODULE=claims_demo.settings_prod
+
+Same as settings.py, but with DEBUG off and templates compiled once per
+process by the cached loader instead of being re-read and re-parsed.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", SECRET_KEY)  # noqa: F405
+
+ALLOWED_HOSTS = [h for h in os.environ.get("DJANGO_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",") if h]
+
+# Django enables the cached loader whenever DEBUG is off; spelling it out keeps
+# it on even if someone flips DEBUG here. The debug context processor is
+# dropped; it does nothing useful with DEBUG off.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],  # noqa: F405
+        "APP_DIRS": False,
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+                "django.contrib.auth.context_processors.auth",
+                "django.contrib.messages.context_processors.messages",
+            ],
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
+        },
+    },
+]
+
+# Static files: `manage.py collectstatic` writes content-hashed copies
+# (app.3f2a9c.css) to STATIC_ROOT, so they can be cached for a year and a
+# deploy changes the URL instead of relying on revalidation. With the optional
+# `whitenoise` package the app serves them itself (hashed names get an immutable Cache-Control,
+# precompressed .gz/.br); without it, point the reverse proxy at STATIC_ROOT
+# with a far-future Cache-Control.
+try:
+    import whitenoise  # noqa: F401
+except ImportError:
+    _staticfiles_backend = "django.contrib.staticfiles.storage.ManifestStaticFilesStorage"
+else:
+    _staticfiles_backend = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+    MIDDLEWARE = list(MIDDLEWARE)  # noqa: F405
+    MIDDLEWARE.insert(MIDDLEWARE.index("django.middleware.security.SecurityMiddleware") + 1,
+                      "whitenoise.middleware.WhiteNoiseMiddleware")
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": _staticfiles_backend},
+}